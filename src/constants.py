@@ -9,6 +9,8 @@ USR_WHITE = 0
 USR_BLACK = 1
 USR_SPECTATOR = 2
 
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
 
 class Palette(Enum):
     CHECK = "#FF0000"
@@ -0,0 +1,124 @@
+import multiprocessing
+import queue
+
+from .position import Position
+from .search import Searcher, SearchInfo
+from .transposition import TranspositionTable
+
+
+class AnalysisException(Exception):
+    pass
+
+
+class _GenerationStop:
+    """Stop signal for the analysis searcher: set as soon as a newer job than ``generation`` is posted."""
+
+    def __init__(self, current, generation: int):
+        self.current = current
+        self.generation = generation
+
+    def is_set(self):
+        return self.current.value != self.generation
+
+
+def _analysis_worker(jobs, results, current, hash_mb: float):
+    searcher = Searcher(TranspositionTable(hash_mb))
+
+    while True:
+        job = jobs.get()
+
+        # only the newest job matters, skip the ones queued while the last search was winding down
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+
+        if job is None:
+            return
+
+        generation, position, time_limit = job
+        if current.value != generation:
+            continue
+
+        searcher.stop_event = _GenerationStop(current, generation)
+        info = searcher.search(position, time_limit=time_limit,
+                               on_iteration=lambda iteration: results.put((generation, iteration, False)))
+        results.put((generation, info, True))
+
+
+class Analyser:
+    """
+    Analyses positions in a separate process so the search never competes with the pygame loop for the GIL.
+    ``analyse`` cancels whatever is being searched and starts on the new position; ``poll`` collects the
+    latest completed iteration without blocking. With a time limit it also serves as the engine's move search:
+    ``finished`` turns True once the search is over, ``info`` then holding its result (None without legal moves).
+    """
+
+    def __init__(self, hash_mb: float = 16):
+        self._current = multiprocessing.Value('i', 0, lock=False)
+        self._jobs = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+
+        self._process = multiprocessing.Process(target=_analysis_worker,
+                                                args=(self._jobs, self._results, self._current, hash_mb),
+                                                daemon=True)
+        self._process.start()
+
+        # side to move in the position being analysed, scores are reported from its point of view
+        self.turn = None
+        self.info: None | SearchInfo = None
+        self.finished = False
+
+    def analyse(self, position: Position, time_limit: float | None = None):
+        if self._process is None:
+            raise AnalysisException("Analyser is closed")
+
+        self._current.value += 1
+        self.turn = position.turn
+        self.info = None
+        self.finished = False
+        self._jobs.put((self._current.value, position, time_limit))
+
+    def cancel(self):
+        self._current.value += 1
+        self.turn = None
+        self.info = None
+        self.finished = False
+
+    def poll(self):
+        """Latest iteration for the current position if one arrived since the last call, else None."""
+        latest = None
+
+        while True:
+            try:
+                generation, info, finished = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            if generation != self._current.value:
+                continue
+
+            if finished:
+                self.finished = True
+                self.info = info
+            elif info is not None:
+                latest = info
+
+        if latest is not None and not self.finished:
+            self.info = latest
+
+        return latest
+
+    def close(self):
+        if self._process is None:
+            return
+
+        self.cancel()
+        self._jobs.put(None)
+        self._process.join(1)
+
+        if self._process.is_alive():
+            self._process.terminate()
+
+        self._process = None
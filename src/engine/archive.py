@@ -0,0 +1,306 @@
+"""
+Binary game archive. Games are stored as their 16-bit move codes (see ``move``) plus tags, packed into blocks
+that are compressed independently with zlib or lzma. An index of blocks at the end of the file lets a single
+game be read by decompressing only its block, and sequential scans decompress block after block.
+
+Layout (little endian)::
+
+    header  b"CPYA" version:u8 codec:u8 reserved:u16
+    blocks  compressed(count:u32 offsets:u32[count] records...)
+    index   (offset:u64 size:u32 first_game:u32 games:u32)[blocks]
+    footer  index_offset:u64 blocks:u32 b"CPYA"
+
+    record  result:u8 tags_size:u16 tags:"name\\0value\\0..." plies:u16 moves:u16[plies]
+"""
+import argparse
+import bisect
+import lzma
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from .pgn import PGNGame, RESULTS, read_games
+from .notation import game_movetext
+
+MAGIC = b"CPYA"
+VERSION = 1
+
+ZLIB = 0
+LZMA = 1
+CODECS = {"zlib": ZLIB, "lzma": LZMA}
+
+_HEADER = struct.Struct("<4sBBH")
+_INDEX_ENTRY = struct.Struct("<QIII")
+_FOOTER = struct.Struct("<QI4s")
+_RECORD_HEAD = struct.Struct("<BH")
+_PLIES = struct.Struct("<H")
+
+
+class ArchiveException(Exception):
+    pass
+
+
+def _compress(data: bytes, codec: int):
+    return zlib.compress(data, 6) if codec == ZLIB else lzma.compress(data)
+
+
+def _decompress(data: bytes, codec: int):
+    return zlib.decompress(data) if codec == ZLIB else lzma.decompress(data)
+
+
+def _encode_game(game: PGNGame):
+    tags = "".join(f"{name}\0{value}\0" for name, value in game.headers.items()).encode("utf-8")
+    moves = array('H', game.moves)
+
+    if len(tags) > 0xFFFF or len(moves) > 0xFFFF:
+        raise ArchiveException("Game too long to archive")
+
+    if sys.byteorder != "little":
+        moves.byteswap()
+
+    return _RECORD_HEAD.pack(RESULTS.index(game.result), len(tags)) + tags + _PLIES.pack(len(moves)) \
+        + moves.tobytes()
+
+
+def _decode_game(data: bytes, offset: int):
+    game = PGNGame()
+
+    result, tags_size = _RECORD_HEAD.unpack_from(data, offset)
+    offset += _RECORD_HEAD.size
+    game.result = RESULTS[result]
+
+    fields = data[offset:offset + tags_size].decode("utf-8").split("\0")
+    game.headers = dict(zip(fields[0:-1:2], fields[1::2]))
+    offset += tags_size
+
+    plies, = _PLIES.unpack_from(data, offset)
+    offset += _PLIES.size
+    game.moves.frombytes(data[offset:offset + plies * 2])
+
+    if sys.byteorder != "little":
+        game.moves.byteswap()
+
+    return game
+
+
+class ArchiveWriter:
+    def __init__(self, path: str, codec=ZLIB, block_games=256):
+        if codec not in (ZLIB, LZMA):
+            raise ArchiveException(f"Unknown codec {codec}")
+
+        self.codec = codec
+        self.block_games = block_games
+        self.games = 0
+
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, codec, 0))
+
+        self._records: list[bytes] = []
+        self._index: list[tuple[int, int, int, int]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, game: PGNGame):
+        """Append ``game``; its moves must be legal from its start position (games with an error are refused)."""
+        if game.error is not None:
+            raise ArchiveException(f"Cannot archive a game that failed to replay: {game.error}")
+
+        self._records.append(_encode_game(game))
+        self.games += 1
+
+        if len(self._records) >= self.block_games:
+            self._flush()
+
+    def _flush(self):
+        if not self._records:
+            return
+
+        offsets = array('I')
+        position = 4 + 4 * len(self._records)
+        for record in self._records:
+            offsets.append(position)
+            position += len(record)
+
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+        data = _compress(struct.pack("<I", len(self._records)) + offsets.tobytes() + b"".join(self._records),
+                         self.codec)
+
+        self._index.append((self._file.tell(), len(data), self.games - len(self._records), len(self._records)))
+        self._file.write(data)
+        self._records = []
+
+    def close(self):
+        if self._file is None:
+            return
+
+        self._flush()
+
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(_INDEX_ENTRY.pack(*entry))
+
+        self._file.write(_FOOTER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class ArchiveReader:
+    """Random access (``reader[i]``) and sequential iteration over the games of an archive."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+
+        magic, version, self.codec, _ = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ArchiveException(f"{path} is not a version {VERSION} game archive")
+
+        self._file.seek(-_FOOTER.size, 2)
+        index_offset, blocks, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != MAGIC:
+            raise ArchiveException(f"{path} is truncated")
+
+        self._file.seek(index_offset)
+        data = self._file.read(blocks * _INDEX_ENTRY.size)
+        self._index = [_INDEX_ENTRY.unpack_from(data, i * _INDEX_ENTRY.size) for i in range(blocks)]
+        self._first_games = [entry[2] for entry in self._index]
+
+        # the last block read, random access to neighbouring games often hits it again
+        self._cached_block = None
+        self._cached_data = None
+
+    def __len__(self):
+        if not self._index:
+            return 0
+
+        return self._index[-1][2] + self._index[-1][3]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def blocks(self):
+        """(first game, games) of each compressed block, the units worth handing out to separate readers."""
+        return [(first_game, games) for _, _, first_game, games in self._index]
+
+    def games(self, start: int, stop: int):
+        """Games ``start`` to ``stop`` - 1, decompressing each block once."""
+        for game_id in range(start, stop):
+            yield self[game_id]
+
+    def _block(self, block: int):
+        if block != self._cached_block:
+            offset, size, _, _ = self._index[block]
+
+            self._file.seek(offset)
+            self._cached_data = _decompress(self._file.read(size), self.codec)
+            self._cached_block = block
+
+        return self._cached_data
+
+    def __getitem__(self, game_id: int) -> PGNGame:
+        if not 0 <= game_id < len(self):
+            raise IndexError(f"Game {game_id} not in archive of {len(self)} games")
+
+        block = bisect.bisect_right(self._first_games, game_id) - 1
+        data = self._block(block)
+        offset, = struct.unpack_from("<I", data, 4 + 4 * (game_id - self._index[block][2]))
+
+        return _decode_game(data, offset)
+
+    def __iter__(self):
+        for block in range(len(self._index)):
+            data = self._block(block)
+            count, = struct.unpack_from("<I", data, 0)
+
+            for i in range(count):
+                offset, = struct.unpack_from("<I", data, 4 + 4 * i)
+                yield _decode_game(data, offset)
+
+    def close(self):
+        self._file.close()
+
+
+def is_archive(path: str):
+    """Whether ``path`` is a game archive rather than a PGN file."""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def iter_games(path: str):
+    """Every game of ``path``, a game archive or a PGN file (replayed), in order."""
+    if is_archive(path):
+        with ArchiveReader(path) as reader:
+            yield from reader
+    else:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            yield from read_games(file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack PGN files into a binary game archive and read it back.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="replay PGN files and archive the games")
+    pack.add_argument("archive")
+    pack.add_argument("files", nargs="+", help="PGN files")
+    pack.add_argument("--codec", choices=CODECS, default="zlib")
+    pack.add_argument("--block-games", type=int, default=256, help="games per compressed block")
+
+    show = commands.add_parser("show", help="print one game")
+    show.add_argument("archive")
+    show.add_argument("game", type=int, help="game number, from 0")
+
+    scan = commands.add_parser("scan", help="decode every game and report throughput")
+    scan.add_argument("archive")
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    match args.command:
+        case "pack":
+            skipped = 0
+
+            with ArchiveWriter(args.archive, CODECS[args.codec], args.block_games) as writer:
+                for path in args.files:
+                    with open(path, encoding="utf-8", errors="replace") as file:
+                        for game in read_games(file):
+                            if game.error is not None:
+                                skipped += 1
+                                continue
+                            writer.add(game)
+
+            print(f"archived {writer.games} games, skipped {skipped}  time {time.perf_counter() - start:.3f}s")
+        case "show":
+            with ArchiveReader(args.archive) as reader:
+                game = reader[args.game]
+
+            for name, value in game.headers.items():
+                escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+                print(f'[{name} "{escaped}"]')
+            print()
+            print(game_movetext(game.replay()), game.result)
+        case "scan":
+            games = plies = 0
+
+            with ArchiveReader(args.archive) as reader:
+                for game in reader:
+                    games += 1
+                    plies += len(game)
+
+            elapsed = time.perf_counter() - start
+            print(f"games {games}  plies {plies}  time {elapsed:.3f}s  "
+                  f"games/s {int(games / elapsed) if elapsed else 0}  plies/s {int(plies / elapsed) if elapsed else 0}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Per-square attack sets and rays, built once at import from the move tables in ``constants``.
+"""
+from ..constants import *
+from .bitboard import bit
+
+DIRECTIONS = QUEEN_DIRECTIONS
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+BISHOP_DIRECTION_INDICES = tuple(DIRECTION_INDEX[direction] for direction in BISHOP_DIRECTIONS)
+ROOK_DIRECTION_INDICES = tuple(DIRECTION_INDEX[direction] for direction in ROOK_DIRECTIONS)
+EAST = DIRECTION_INDEX[(1, 0)]
+WEST = DIRECTION_INDEX[(-1, 0)]
+
+
+def _on_board(x: int, y: int):
+    return 0 <= x < 8 and 0 <= y < 8
+
+
+def _step_table(steps: tuple[tuple[int, int], ...]):
+    table = []
+
+    for square in range(64):
+        x, y = square % 8, square // 8
+        table.append(sum(bit((y + dy) * 8 + x + dx) for dx, dy in steps if _on_board(x + dx, y + dy)))
+
+    return table
+
+
+def _ray_squares(square: int, direction: tuple[int, int]):
+    x, y = square % 8, square // 8
+    squares = []
+
+    while _on_board(x + direction[0], y + direction[1]):
+        x += direction[0]
+        y += direction[1]
+        squares.append(y * 8 + x)
+
+    return squares
+
+
+KNIGHT_ATTACKS = _step_table(KNIGHT_MOVES)
+KING_ATTACKS = _step_table(KING_MOVES)
+# indexed by the attacking pawn's color
+PAWN_ATTACKS = [_step_table(((-1, 1), (1, 1))), _step_table(((-1, -1), (1, -1)))]
+
+# RAY_SQUARES[direction][square] lists the squares walked from ``square`` (nearest first), RAYS the same as a bitboard
+RAY_SQUARES = [[_ray_squares(square, direction) for square in range(64)] for direction in DIRECTIONS]
+RAYS = [[sum(bit(s) for s in squares) for squares in direction_squares] for direction_squares in RAY_SQUARES]
+
+# rays heading towards higher square indices find their nearest blocker at the lowest set bit, the others at the highest
+_POSITIVE = [dx + 8 * dy > 0 for dx, dy in DIRECTIONS]
+_BISHOP_RAYS = [(RAYS[i], _POSITIVE[i]) for i in BISHOP_DIRECTION_INDICES]
+_ROOK_RAYS = [(RAYS[i], _POSITIVE[i]) for i in ROOK_DIRECTION_INDICES]
+
+BISHOP_RAYS = [sum(RAYS[i][square] for i in BISHOP_DIRECTION_INDICES) for square in range(64)]
+ROOK_RAYS = [sum(RAYS[i][square] for i in ROOK_DIRECTION_INDICES) for square in range(64)]
+
+# BETWEEN[a][b] holds the squares strictly between two squares sharing a line, 0 otherwise
+BETWEEN = [[0] * 64 for _ in range(64)]
+for _direction_squares in RAY_SQUARES:
+    for _square in range(64):
+        _passed = 0
+        for _target in _direction_squares[_square]:
+            BETWEEN[_square][_target] = _passed
+            _passed |= bit(_target)
+
+
+def ray_attacks(square: int, direction: int, occupancy: int):
+    """Squares along direction index ``direction`` from ``square`` up to and including the first blocker."""
+    ray = RAYS[direction][square]
+    blockers = ray & occupancy
+
+    if blockers:
+        first = (blockers & -blockers).bit_length() - 1 if _POSITIVE[direction] else blockers.bit_length() - 1
+        ray ^= RAYS[direction][first]
+
+    return ray
+
+
+def bishop_attacks(square: int, occupancy: int):
+    attacks = 0
+
+    for rays, positive in _BISHOP_RAYS:
+        ray = rays[square]
+        blockers = ray & occupancy
+
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1]
+        attacks |= ray
+
+    return attacks
+
+
+def rook_attacks(square: int, occupancy: int):
+    attacks = 0
+
+    for rays, positive in _ROOK_RAYS:
+        ray = rays[square]
+        blockers = ray & occupancy
+
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1]
+        attacks |= ray
+
+    return attacks
+
+
+def queen_attacks(square: int, occupancy: int):
+    return bishop_attacks(square, occupancy) | rook_attacks(square, occupancy)
@@ -0,0 +1,228 @@
+"""
+Batch replay of game collections over a process pool. PGN files are cut into byte ranges at game boundaries and
+archives into runs of compressed blocks; each worker replays its shard through the legal move generator and
+returns its statistics, which are merged in corpus order.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import time
+import warnings
+from collections import Counter
+
+from ..constants import *
+from .position import Position, PositionException
+from .move import move_to_uci
+from .pgn import read_games
+from .archive import ArchiveReader, is_archive
+
+# the characters that change the PGN reader's state within movetext
+_PGN_DELIMITER = re.compile(rb"[{}();]")
+_SHARD_BYTES = 1 << 20
+_SHARD_GAMES = 1024
+_OPENING_PLIES = 6
+_LENGTH_BUCKET = 10
+
+
+class BatchStats:
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        # (game number in the corpus, source, message)
+        self.errors: list[tuple[int, str, str]] = []
+        self.results = Counter()
+        self.lengths = Counter()
+        self.openings = Counter()
+
+    def add_game(self, game, source: str, error: None | str):
+        if error is not None:
+            self.errors.append((self.games, source, error))
+
+        self.games += 1
+        self.plies += len(game)
+        self.results[game.result] += 1
+        self.lengths[len(game) // _LENGTH_BUCKET * _LENGTH_BUCKET] += 1
+
+        if "FEN" not in game.headers and len(game) >= _OPENING_PLIES:
+            self.openings[" ".join(move_to_uci(move) for move in game.moves[:_OPENING_PLIES])] += 1
+
+    def merge(self, other):
+        """Add the statistics of ``other``, whose games come after these ones."""
+        self.errors.extend((self.games + game, source, error) for game, source, error in other.errors)
+        self.games += other.games
+        self.plies += other.plies
+        self.results += other.results
+        self.lengths += other.lengths
+        self.openings += other.openings
+
+
+def _pgn_shards(path: str, shard_bytes: int):
+    """
+    Byte ranges of ``path`` of at least ``shard_bytes``, cut where ``read_games`` starts a game: at a tag line
+    following movetext, outside comments and variations. Only braces, parentheses and semicolons are looked at,
+    so the scan runs far faster than the replay.
+    """
+    starts = [0]
+    in_comment = after_movetext = False
+    variation_depth = 0
+    offset = 0
+
+    with open(path, "rb") as file:
+        for line in file:
+            if not in_comment and not variation_depth:
+                stripped = line.strip()
+
+                if stripped.startswith(b"["):
+                    if after_movetext and offset - starts[-1] >= shard_bytes:
+                        starts.append(offset)
+                    after_movetext = False
+                    offset += len(line)
+                    continue
+
+                if stripped and not stripped.startswith(b"%"):
+                    after_movetext = True
+
+            for token in _PGN_DELIMITER.findall(line):
+                if in_comment:
+                    in_comment = token != b"}"
+                elif token == b"{":
+                    in_comment = True
+                elif token == b";":
+                    break
+                elif token == b"(":
+                    variation_depth += 1
+                elif token == b")":
+                    variation_depth = max(0, variation_depth - 1)
+
+            offset += len(line)
+
+    if len(starts) == 1 and offset > 2 * shard_bytes:
+        warnings.warn(f"no game boundary found in {path} past its first {shard_bytes} bytes, it is read as one shard")
+
+    return [("pgn", path, start, stop) for start, stop in zip(starts, starts[1:] + [offset])]
+
+
+def _archive_shards(path: str, shard_games: int):
+    shards = []
+
+    with ArchiveReader(path) as reader:
+        for first_game, games in reader.blocks():
+            if shards and shards[-1][3] - shards[-1][2] < shard_games:
+                shards[-1] = ("archive", path, shards[-1][2], first_game + games)
+            else:
+                shards.append(("archive", path, first_game, first_game + games))
+
+    return shards
+
+
+def make_shards(paths, shard_bytes=_SHARD_BYTES, shard_games=_SHARD_GAMES):
+    shards = []
+
+    for path in paths:
+        shards.extend(_archive_shards(path, shard_games) if is_archive(path) else _pgn_shards(path, shard_bytes))
+
+    return shards
+
+
+def _replay_moves(game):
+    """Error replaying the moves of an archived game through the legal move generator, None if they are legal."""
+    fen = game.headers.get("FEN")
+
+    try:
+        position = Position(fen) if fen else Position(START_CONFIG)
+    except PositionException as e:
+        return f"invalid FEN tag: {e}"
+
+    for ply, move in enumerate(game.moves, 1):
+        if move not in position.generate_legal_moves():
+            return f"illegal move {move_to_uci(move)} at ply {ply}"
+
+        position.make_move(move)
+
+    return None
+
+
+def replay_shard(shard):
+    kind, path, start, stop = shard
+    stats = BatchStats()
+
+    if kind == "pgn":
+        with open(path, "rb") as file:
+            file.seek(start)
+            text = file.read(stop - start).decode("utf-8", errors="replace")
+
+        for game in read_games(text.splitlines()):
+            stats.add_game(game, path, game.error)
+    else:
+        with ArchiveReader(path) as reader:
+            for game in reader.games(start, stop):
+                stats.add_game(game, path, _replay_moves(game))
+
+    return stats
+
+
+def replay_corpus(shards, workers: int):
+    stats = BatchStats()
+
+    if workers == 1:
+        for shard in shards:
+            stats.merge(replay_shard(shard))
+        return stats
+
+    with multiprocessing.Pool(workers) as pool:
+        # results come back in shard order so game numbers stay those of the corpus
+        for shard_stats in pool.imap(replay_shard, shards):
+            stats.merge(shard_stats)
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay PGN files and game archives over 1 to N worker processes.")
+    parser.add_argument("files", nargs="+", help="PGN files or game archives")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="highest worker count")
+    parser.add_argument("--only", action="store_true", help="only run with the highest worker count")
+    parser.add_argument("--shard-mb", type=float, default=_SHARD_BYTES / (1 << 20), help="PGN bytes per shard")
+    parser.add_argument("--shard-games", type=int, default=_SHARD_GAMES, help="archived games per shard")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every game that fails to replay")
+    parser.add_argument("--top", type=int, default=10, help="openings to list")
+    args = parser.parse_args(argv)
+
+    shards = make_shards(args.files, max(1, int(args.shard_mb * (1 << 20))), args.shard_games)
+    base_time = stats = None
+
+    for workers in [args.workers] if args.only else range(1, args.workers + 1):
+        start = time.perf_counter()
+        stats = replay_corpus(shards, workers)
+        elapsed = time.perf_counter() - start
+
+        if base_time is None:
+            base_time = elapsed
+
+        print(f"workers {workers}  shards {len(shards)}  time {elapsed:.3f}s  "
+              f"games/s {int(stats.games / elapsed) if elapsed else 0}  "
+              f"plies/s {int(stats.plies / elapsed) if elapsed else 0}  speedup {base_time / elapsed:.2f}")
+
+    print(f"\ngames {stats.games}  plies {stats.plies}  errors {len(stats.errors)}  "
+          f"mean length {stats.plies / stats.games if stats.games else 0:.1f} plies")
+
+    if args.verbose:
+        for game, source, error in stats.errors:
+            print(f"game {game} ({source}): {error}")
+
+    print("\nresults")
+    for result, count in stats.results.most_common():
+        print(f"  {result:8} {count}")
+
+    print("\nlengths (plies)")
+    for length, count in sorted(stats.lengths.items()):
+        print(f"  {length:3}-{length + _LENGTH_BUCKET - 1:<3} {count}")
+
+    print(f"\nopenings (first {_OPENING_PLIES} plies)")
+    for opening, count in stats.openings.most_common(args.top):
+        print(f"  {count:6}  {opening}")
+
+
+if __name__ == '__main__':
+    main()
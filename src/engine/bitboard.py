@@ -0,0 +1,22 @@
+FULL = (1 << 64) - 1
+
+RANK_1 = 0xFF
+RANK_8 = RANK_1 << 56
+
+LIGHT_SQUARES = 0x55AA55AA55AA55AA
+DARK_SQUARES = FULL ^ LIGHT_SQUARES
+
+
+def bit(square: int):
+    return 1 << square
+
+
+def lsb(bb: int):
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_bits(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
@@ -0,0 +1,58 @@
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EN_PASSANT = 5
+# promotions set the PROMOTION bit (and CAPTURE when taking) plus the promoted piece in the low two bits
+PROMOTION = 8
+KNIGHT_PROMOTION = 8
+BISHOP_PROMOTION = 9
+ROOK_PROMOTION = 10
+QUEEN_PROMOTION = 11
+
+SQUARE_NAMES = [file + rank for rank in "12345678" for file in "abcdefgh"]
+SQUARE_INDEX = {name: index for index, name in enumerate(SQUARE_NAMES)}
+
+
+def encode_move(from_square: int, to_square: int, flag=QUIET):
+    return from_square | (to_square << 6) | (flag << 12)
+
+
+def move_from(move: int):
+    return move & 0x3F
+
+
+def move_to(move: int):
+    return (move >> 6) & 0x3F
+
+
+def move_flag(move: int):
+    return move >> 12
+
+
+def is_capture(move: int):
+    return bool((move >> 12) & CAPTURE)
+
+
+def is_castle(move: int):
+    return (move >> 12) in (KING_CASTLE, QUEEN_CASTLE)
+
+
+def is_promotion(move: int):
+    return bool((move >> 12) & PROMOTION)
+
+
+def promotion_kind(move: int):
+    """Kind (KNIGHT to QUEEN) a promotion turns the pawn into."""
+    return 1 + ((move >> 12) & 0x3)
+
+
+def move_to_uci(move: int):
+    """Long algebraic (UCI) form of ``move``, e.g. ``e2e4`` or ``e7e8q``."""
+    uci = SQUARE_NAMES[move & 0x3F] + SQUARE_NAMES[(move >> 6) & 0x3F]
+
+    if (move >> 12) & PROMOTION:
+        uci += "nbrq"[(move >> 12) & 0x3]
+
+    return uci
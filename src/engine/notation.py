@@ -0,0 +1,170 @@
+"""
+Standard algebraic notation (SAN) for encoded moves, read against a position's legal moves.
+"""
+from ..constants import *
+from .move import *
+
+_PIECE_LETTERS = {"N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING}
+
+
+def parse_san(position, san: str):
+    """The legal move of the side to move written as ``san``, or None when there is no such (unique) move."""
+    san = san.rstrip("+#!?")
+
+    if san in ("O-O", "0-0"):
+        return _find_castle(position, KING_CASTLE)
+    if san in ("O-O-O", "0-0-0"):
+        return _find_castle(position, QUEEN_CASTLE)
+
+    promotion = None
+    if len(san) > 2 and san[-1] in "NBRQ" and (san[-2] == "=" or san[-2] in "18"):
+        promotion = _PIECE_LETTERS[san[-1]]
+        san = san[:-2] if san[-2] == "=" else san[:-1]
+
+    to_index = SQUARE_INDEX.get(san[-2:])
+    if to_index is None:
+        return None
+
+    kind = _PIECE_LETTERS.get(san[0], PAWN)
+    # whatever sits between the piece letter and the destination: disambiguation and the capture mark
+    hint = san[0 if kind == PAWN else 1:-2].replace("x", "")
+
+    from_file = from_rank = None
+    for char in hint:
+        if "a" <= char <= "h":
+            from_file = ord(char) - 97
+        elif "1" <= char <= "8":
+            from_rank = ord(char) - 49
+        else:
+            return None
+
+    found = None
+
+    for move in position.legal_moves():
+        if move >> 6 & 0x3F != to_index:
+            continue
+
+        from_index = move & 0x3F
+        if position.piece_at(from_index).kind != kind:
+            continue
+        if from_file is not None and from_index % 8 != from_file:
+            continue
+        if from_rank is not None and from_index // 8 != from_rank:
+            continue
+
+        flag = move >> 12
+        if flag & PROMOTION:
+            if promotion != KNIGHT + (flag & 0x3):
+                continue
+        elif promotion is not None:
+            continue
+
+        if found is not None:
+            # ambiguous
+            return None
+        found = move
+
+    return found
+
+
+def _find_castle(position, flag: int):
+    for move in position.legal_moves():
+        if move >> 12 == flag:
+            return move
+
+    return None
+
+
+def to_san(position, move: int):
+    """
+    SAN of the legal ``move`` in ``position``. Disambiguation is read off the position's cached legal moves;
+    only a checking move generates the replies it leaves, to tell check from mate.
+    """
+    from_index, to_index, flag = move & 0x3F, (move >> 6) & 0x3F, move >> 12
+
+    if flag == KING_CASTLE:
+        san = "O-O"
+    elif flag == QUEEN_CASTLE:
+        san = "O-O-O"
+    else:
+        kind = position.piece_at(from_index).kind
+        target = SQUARE_NAMES[to_index]
+
+        if kind == PAWN:
+            san = SQUARE_NAMES[from_index][0] + "x" + target if flag & CAPTURE else target
+            if flag & PROMOTION:
+                san += "=" + "NBRQ"[flag & 0x3]
+        else:
+            san = "NBRQK"[kind - KNIGHT] + _disambiguation(position, move, kind) \
+                  + ("x" if flag & CAPTURE else "") + target
+
+    position.make_move(move)
+
+    if position.in_check():
+        # keep the parent's legal move cache, the replies are only needed here
+        san += "+" if position.generate_legal_moves() else "#"
+
+    position.unmake_move()
+    return san
+
+
+def _disambiguation(position, move: int, kind: int):
+    from_index, to_index = move & 0x3F, (move >> 6) & 0x3F
+    same_file = same_rank = rivals = False
+
+    for other in position.legal_moves():
+        other_from = other & 0x3F
+
+        if (other >> 6) & 0x3F != to_index or other_from == from_index or position.piece_at(other_from).kind != kind:
+            continue
+
+        rivals = True
+        same_file |= other_from % 8 == from_index % 8
+        same_rank |= other_from // 8 == from_index // 8
+
+    if not rivals:
+        return ""
+    if not same_file:
+        return SQUARE_NAMES[from_index][0]
+    if not same_rank:
+        return SQUARE_NAMES[from_index][1]
+    return SQUARE_NAMES[from_index]
+
+
+def san_moves(position, moves):
+    """SAN of each move of ``moves`` played in turn from ``position``, which is left as it was."""
+    sans = []
+
+    for move in moves:
+        sans.append(to_san(position, move))
+        position.make_move(move)
+
+    for _ in sans:
+        position.unmake_move()
+
+    return sans
+
+
+def movetext(sans: list[str], fullmove_number=1, turn=USR_WHITE):
+    """Numbered PGN movetext, e.g. ``1. e4 e5 2. Nf3``; a game starting with black opens with ``1...``."""
+    parts = []
+
+    for san in sans:
+        if turn == USR_WHITE:
+            parts.append(f"{fullmove_number}.")
+        elif not parts:
+            parts.append(f"{fullmove_number}...")
+
+        parts.append(san)
+
+        if turn == USR_BLACK:
+            fullmove_number += 1
+        turn ^= 1
+
+    return " ".join(parts)
+
+
+def game_movetext(position):
+    """PGN movetext of every move the game in ``position`` has been through."""
+    root = position.position_at(0)
+    return movetext(san_moves(root, position.history), root.fullmove_number, root.turn)
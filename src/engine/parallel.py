@@ -0,0 +1,139 @@
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+from .position import Position
+from .perft import load_position
+from .move import move_to_uci
+from .search import Searcher, SearchException, SearchInfo, MAX_PLY
+from .transposition import TranspositionTable
+
+# per helper process state, set up once by _init_helper
+_helper_memory = None
+_helper_searcher = None
+
+
+def _init_helper(memory_name: str, stop_event):
+    global _helper_memory, _helper_searcher
+
+    _helper_memory = shared_memory.SharedMemory(name=memory_name)
+    _helper_searcher = Searcher(TranspositionTable(buffer=_helper_memory.buf), stop_event)
+
+
+def _helper_search(position: Position, depth: int, age: int, helper: int):
+    # new_search() bumps the age, so start one behind the main searcher's
+    _helper_searcher.table.age = (age - 1) & 0x3F
+
+    # helpers that walk the tree exactly like the main search only repeat its work: odd ones start a ply deeper,
+    # and each one breaks history ties its own way
+    noise = random.Random(helper)
+    for side in _helper_searcher._history:
+        for i in range(len(side)):
+            side[i] += noise.randrange(64)
+
+    _helper_searcher.search(position, depth, start_depth=1 + helper % 2)
+
+    return _helper_searcher.nodes
+
+
+class ParallelSearcher:
+    """
+    Lazy SMP: the calling process and ``workers - 1`` helper processes search the same position at once,
+    sharing one transposition table in shared memory, so each benefits from the others' results. The
+    caller's own search decides the move; the helpers are stopped as soon as it finishes.
+    """
+
+    def __init__(self, workers: int | None = None, hash_mb: float = 16):
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+
+        if self.workers < 1:
+            raise SearchException("Parallel search needs at least one worker")
+
+        self._memory = shared_memory.SharedMemory(create=True, size=TranspositionTable.buffer_size(hash_mb))
+        self.table = TranspositionTable(buffer=self._memory.buf)
+
+        self._stop_event = multiprocessing.Event()
+        self.searcher = Searcher(self.table, self._stop_event)
+        self._pool = None
+
+        if self.workers > 1:
+            self._pool = multiprocessing.Pool(self.workers - 1, _init_helper, (self._memory.name, self._stop_event))
+
+    def stop(self):
+        self._stop_event.set()
+        # the main searcher only polls the event every few nodes, its own flag is seen at once
+        self.searcher.stop()
+
+    def search(self, position: Position, depth=MAX_PLY, time_limit: float | None = None,
+               node_limit: int | None = None, on_iteration=None) -> None | SearchInfo:
+        """Same as ``Searcher.search``; nodes in the returned SearchInfo include the helpers'."""
+        self._stop_event.clear()
+        start = time.perf_counter()
+
+        helpers = []
+        if self._pool is not None and position.generate_legal_moves():
+            age = (self.table.age + 1) & 0x3F
+            helpers = [self._pool.apply_async(_helper_search, (position, depth, age, helper))
+                       for helper in range(1, self.workers)]
+
+        info = self.searcher.search(position, depth, time_limit, node_limit, on_iteration)
+        self._stop_event.set()
+
+        helper_nodes = sum(helper.get() for helper in helpers)
+
+        if info is not None:
+            info.nodes = self.searcher.nodes + helper_nodes
+            info.elapsed = time.perf_counter() - start
+
+        return info
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+        self.table = None
+        self.searcher = None
+        self._memory.close()
+        self._memory.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure parallel search speedup from 1 to N worker processes.")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="highest worker count")
+    parser.add_argument("-c", "--config", default="start",
+                        help="'start', 'test', a 64-character board string or a FEN (default: start)")
+    parser.add_argument("-t", "--turn", choices=["white", "black"], default=None,
+                        help="side to move for a board string (default: white)")
+    parser.add_argument("-d", "--depth", type=int, default=5, help="fixed search depth (default: 5)")
+    parser.add_argument("--hash", type=float, default=16, metavar="MB", help="shared transposition table size")
+    args = parser.parse_args(argv)
+
+    position = load_position(args.config, args.turn)
+
+    base_time = None
+
+    for workers in range(1, args.workers + 1):
+        searcher = ParallelSearcher(workers, args.hash)
+
+        try:
+            info = searcher.search(position, args.depth)
+        finally:
+            searcher.close()
+
+        if info is None:
+            raise SearchException("No legal move in the given position")
+
+        if base_time is None:
+            base_time = info.elapsed
+
+        print(f"workers {workers}  depth {info.depth}  time {info.elapsed:.3f}s  nodes {info.nodes}  "
+              f"nps {info.nps}  speedup {base_time / info.elapsed:.2f}  bestmove {move_to_uci(info.best_move)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import time
+
+from ..constants import *
+from .position import Position, PositionException
+from .move import move_to_uci
+from .transposition import TranspositionTable
+
+
+def perft(position: Position, depth: int, table: TranspositionTable | None = None, stop_event=None):
+    """
+    Number of leaf nodes of the legal move tree ``depth`` plies below ``position``. Setting ``stop_event``
+    (a threading Event) aborts the count, which then comes back short.
+    """
+    if depth <= 0:
+        return 1
+
+    if depth == 1:
+        return len(position.generate_legal_moves())
+
+    # a table hit saves generating the moves too
+    if table is not None:
+        entry = table.probe(position.hash)
+        if entry is not None and entry[2] == depth:
+            return entry[0]
+
+    moves = position.generate_legal_moves()
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1, table, stop_event)
+        position.unmake_move()
+
+        if stop_event is not None and stop_event.is_set():
+            return nodes
+
+    if table is not None and nodes < 0x80000000:
+        table.store(position.hash, depth, nodes)
+
+    return nodes
+
+
+def divide(position: Position, depth: int, table: TranspositionTable | None = None, stop_event=None):
+    """Perft node count below each legal root move, as (move, nodes) pairs; none when ``depth`` is below 1."""
+    counts = []
+
+    if depth < 1:
+        return counts
+
+    for move in position.legal_moves():
+        position.make_move(move)
+        counts.append((move, perft(position, depth - 1, table, stop_event)))
+        position.unmake_move()
+
+        if stop_event is not None and stop_event.is_set():
+            break
+
+    return counts
+
+
+def parse_config(config: str):
+    match config.lower():
+        case "start":
+            return START_CONFIG
+        case "test":
+            return TEST_CONFIG
+        case _:
+            return config
+
+
+def load_position(config: str, turn: str | None = None):
+    """
+    Position for a command line ``config`` (see ``parse_config``), with ``turn`` ("white" or "black") to move.
+    A FEN already names the side to move along with the en-passant square and counters that go with it, so it
+    takes no ``turn``.
+    """
+    config = parse_config(config)
+    position = Position(config)
+
+    if turn is not None:
+        if "/" in config:
+            raise PositionException("A FEN sets its own side to move, --turn only applies to board strings")
+
+        position.turn = USR_WHITE if turn == "white" else USR_BLACK
+        position.hash = position.compute_hash()
+
+    return position
+
+
+def _depth(value: str):
+    depth = int(value)
+    if depth < 1:
+        raise argparse.ArgumentTypeError("depth must be at least 1")
+    return depth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count move generator leaf nodes and report nodes/second.")
+    parser.add_argument("depth", type=_depth, help="plies to search, at least 1")
+    parser.add_argument("-c", "--config", default="start",
+                        help="'start', 'test', a 64-character board string or a FEN (default: start)")
+    parser.add_argument("-t", "--turn", choices=["white", "black"], default=None,
+                        help="side to move for a board string (default: white)")
+    parser.add_argument("-d", "--divide", action="store_true", help="print the node count below each root move")
+    parser.add_argument("--hash", type=float, default=0, metavar="MB",
+                        help="cache subtree counts in a transposition table of this size")
+    parser.add_argument("--iterate", action="store_true", help="run every depth from 1 up to DEPTH")
+    args = parser.parse_args(argv)
+
+    position = load_position(args.config, args.turn)
+
+    table = TranspositionTable(args.hash) if args.hash > 0 else None
+
+    for depth in range(1 if args.iterate else args.depth, args.depth + 1):
+        start = time.perf_counter()
+
+        if args.divide:
+            counts = divide(position, depth, table)
+            for move, nodes in counts:
+                print(f"{move_to_uci(move)}: {nodes}")
+            nodes = sum(count for _, count in counts)
+        else:
+            nodes = perft(position, depth, table)
+
+        elapsed = time.perf_counter() - start
+        print(f"depth {depth}  nodes {nodes}  time {elapsed:.3f}s  nps {int(nodes / elapsed) if elapsed else 0}")
+
+
+if __name__ == '__main__':
+    main()
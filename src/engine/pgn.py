@@ -0,0 +1,174 @@
+"""
+Streaming PGN reader: games are parsed and replayed one at a time straight from the lines of a file, so memory
+stays flat however large the archive is.
+"""
+import argparse
+import re
+import time
+from array import array
+
+from ..constants import *
+from .position import Position, PositionException
+from .notation import parse_san
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+_TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*]')
+_TOKEN = re.compile(r'[{}();]|\$\d+|[^\s{}();]+')
+_MOVE_NUMBER = re.compile(r'\d+\.+')
+
+
+class PGNGame:
+    """Tags, replayed moves and result of one game. ``error`` describes the first move that failed to replay."""
+
+    def __init__(self):
+        self.headers: dict[str, str] = {}
+        self.moves = array('H')
+        self.result = "*"
+        self.error: None | str = None
+        self.position: None | Position = None
+        self._has_movetext = False
+
+    def __len__(self):
+        return len(self.moves)
+
+    def replay(self):
+        """Position after the game's moves, played again from its start position (the moves are trusted)."""
+        fen = self.headers.get("FEN")
+        position = Position(fen) if fen else Position(START_CONFIG)
+
+        for move in self.moves:
+            position.make_move(move)
+
+        return position
+
+    def _start_position(self):
+        fen = self.headers.get("FEN")
+
+        try:
+            self.position = Position(fen) if fen else Position(START_CONFIG)
+        except PositionException as e:
+            self.error = f"invalid FEN tag: {e}"
+
+    def _play_san(self, san: str):
+        if self.position is None and self.error is None:
+            self._start_position()
+
+        if self.error is not None:
+            return
+
+        move = parse_san(self.position, san)
+
+        if move is None:
+            self.error = f"illegal or ambiguous move {san} at ply {len(self.moves) + 1}"
+            return
+
+        self.position.make_move(move)
+        self.moves.append(move)
+
+
+def read_games(lines, replay=True):
+    """
+    Yield a PGNGame per game in ``lines`` (any iterable of text lines, e.g. an open file). With ``replay`` off
+    only tags and results are read, moves are skipped.
+    """
+    game = None
+    in_comment = False
+    variation_depth = 0
+
+    for line in lines:
+        if not in_comment and not variation_depth:
+            stripped = line.strip()
+
+            if stripped.startswith("%"):
+                continue
+
+            if stripped.startswith("["):
+                if game is not None and game._has_movetext:
+                    # the previous game ended without a result token
+                    yield game
+                    game = None
+
+                if game is None:
+                    game = PGNGame()
+
+                for name, value in _TAG.findall(stripped):
+                    game.headers[name] = value.replace('\\"', '"').replace("\\\\", "\\")
+                continue
+
+        for token in _TOKEN.findall(line):
+            if in_comment:
+                in_comment = token != "}"
+                continue
+
+            match token:
+                case "{":
+                    in_comment = True
+                    continue
+                case ";":
+                    # rest of line comment
+                    break
+                case "(":
+                    variation_depth += 1
+                    continue
+                case ")":
+                    variation_depth = max(0, variation_depth - 1)
+                    continue
+
+            if variation_depth or token[0] == "$":
+                continue
+
+            if game is None:
+                game = PGNGame()
+            game._has_movetext = True
+
+            if token in RESULTS:
+                game.result = token
+                yield game
+                game = None
+                continue
+
+            # move numbers may be glued to the move, "12.e4" or "12...e5"
+            number = _MOVE_NUMBER.match(token)
+            if number is not None:
+                token = token[number.end():]
+                if not token:
+                    continue
+
+            if replay:
+                game._play_san(token)
+
+    if game is not None and (game._has_movetext or game.headers):
+        yield game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read PGN files, replay every game and report throughput.")
+    parser.add_argument("files", nargs="+", help="PGN files to read")
+    parser.add_argument("--no-replay", action="store_true", help="only parse tags and results")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every game that fails to replay")
+    args = parser.parse_args(argv)
+
+    games = plies = errors = 0
+    start = time.perf_counter()
+
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            for game in read_games(file, not args.no_replay):
+                if game.error is not None:
+                    errors += 1
+                    if args.verbose:
+                        # numbered from 0 like archive and position index game ids
+                        print(f"game {games} ({game.headers.get('White', '?')} - {game.headers.get('Black', '?')}): "
+                              f"{game.error}")
+
+                games += 1
+                plies += len(game)
+
+    elapsed = time.perf_counter() - start
+    print(f"games {games}  plies {plies}  errors {errors}  time {elapsed:.3f}s  "
+          f"games/s {int(games / elapsed) if elapsed else 0}  plies/s {int(plies / elapsed) if elapsed else 0}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,902 @@
+import sys
+from array import array
+
+from ..constants import *
+from ..square import Square
+from ..pieces import Piece, PIECES, PIECES_BY_SHORT
+from .bitboard import FULL, RANK_1, RANK_8, LIGHT_SQUARES, DARK_SQUARES, lsb, iter_bits
+from .attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BISHOP_RAYS, ROOK_RAYS, RAY_SQUARES, BETWEEN, \
+    BISHOP_DIRECTION_INDICES, ROOK_DIRECTION_INDICES, EAST, WEST, bishop_attacks, rook_attacks, queen_attacks, \
+    ray_attacks
+from .move import *
+from .zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+
+
+class PositionException(Exception):
+    pass
+
+
+# pawns of either color only ever reach the far rank of their own direction
+PROMOTION_RANKS = RANK_1 | RANK_8
+
+
+def _add_promotions(moves: list[int], from_index: int, to_index: int, flag: int):
+    for kind in (QUEEN, KNIGHT, ROOK, BISHOP):
+        moves.append(encode_move(from_index, to_index, flag | (kind - KNIGHT)))
+
+
+def _is_under_promotion(move: int):
+    return move >> 12 & PROMOTION and move >> 12 & 0x3 != QUEEN_PROMOTION & 0x3
+
+
+# FEN writes white in upper case, the board strings in lower case
+_FEN_PIECES = {piece.short.swapcase(): piece for piece in PIECES}
+# castling right letter: (color, king square, rook square)
+_FEN_CASTLING = {"K": (USR_WHITE, 4, 7), "Q": (USR_WHITE, 4, 0), "k": (USR_BLACK, 60, 63), "q": (USR_BLACK, 60, 56)}
+_WHITE_PAWN_RANK = RANK_1 << 8
+_BLACK_PAWN_RANK = RANK_8 >> 8
+
+
+def is_attacked(bitboards: list[int], occupancy: int, square: int, by):
+    offset = by * 6
+
+    if PAWN_ATTACKS[by ^ 1][square] & bitboards[offset + PAWN] \
+            or KNIGHT_ATTACKS[square] & bitboards[offset + KNIGHT] \
+            or KING_ATTACKS[square] & bitboards[offset + KING]:
+        return True
+
+    # only trace rays when a slider is on one of the square's lines at all
+    diagonal = (bitboards[offset + BISHOP] | bitboards[offset + QUEEN]) & BISHOP_RAYS[square]
+    if diagonal and bishop_attacks(square, occupancy) & diagonal:
+        return True
+
+    straight = (bitboards[offset + ROOK] | bitboards[offset + QUEEN]) & ROOK_RAYS[square]
+    return bool(straight and rook_attacks(square, occupancy) & straight)
+
+
+class Position:
+    """
+    Board state held as twelve 64-bit piece bitboards (index ``color * 6 + kind``, bit ``y * 8 + x``)
+    alongside a 64-entry mailbox of the (shared) piece instances.
+
+    ``config`` is either the project's 64-character board string (white to move, everything unmoved) or a
+    FEN record, which also sets the side to move, castling rights, en-passant square and move counters.
+    """
+
+    def __init__(self, config=START_CONFIG):
+        self.config = config
+        self._bitboards = [0] * 12
+        self._occupancy = [0, 0]
+        self._squares: list[None | Piece] = [None] * 64
+        self._king_squares: list[None | int] = [None, None]
+        self.hash = 0
+
+        self.turn = USR_WHITE
+        # squares whose content has not changed since the starting configuration; castling rights and
+        # pawn double pushes are read from here
+        self._unmoved = FULL
+        # square skipped over by a pawn double push on the last move, and the one set up with the position
+        self.en_passant: None | int = None
+        self._root_en_passant: None | int = None
+        # plies since the last capture or pawn move
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+        # legal moves per color of the position with hash ``_legal_cache_hash``; any move, undo or redo changes
+        # the hash and so invalidates them
+        self._legal_cache_hash = None
+        self._legal_cache: list[None | tuple[int, ...]] = [None, None]
+
+        if "/" in config:
+            # hashes the pieces as it places them
+            self._load_fen(config)
+        else:
+            self.str_to_board(config)
+            self.hash = self.compute_hash()
+
+        # the game record is one 16-bit move per ply; alongside it each ply keeps a 16-bit undo record (see
+        # make_move), the halfmove clock and the hash before the move, 14 bytes in all
+        self.history = array('H')
+        self.redo_history = array('H')
+        self._undo_records = array('H')
+        self._clocks = array('H')
+        self._hashes = array('Q')
+
+    def __str__(self):
+        res = ["."] * 64
+
+        for index in iter_bits(self._occupancy[USR_WHITE] | self._occupancy[USR_BLACK]):
+            res[index] = self._squares[index].short
+
+        return "".join(res)
+
+    def __getitem__(self, item: tuple[int, int] | Square) -> None | Piece:
+        if isinstance(item, (tuple, Square)):
+            return self.at(item)
+
+        raise PositionException("Invalid square position. got", item)
+
+    def at(self, pos_or_square: Square | tuple[int, int]):
+        if isinstance(pos_or_square, Square):
+            return self._squares[pos_or_square.index]
+
+        if isinstance(pos_or_square, tuple):
+            if len(pos_or_square) == 2 and Square.is_valid(*pos_or_square):
+                return self._squares[pos_or_square[1] * 8 + pos_or_square[0]]
+
+        raise PositionException("Invalid square position. got", pos_or_square)
+
+    @property
+    def last_move(self) -> tuple[None | Square, None | Square]:
+        if not self.history:
+            return None, None
+
+        move = self.history[-1]
+        return Square.from_board_str_index(move_from(move)), Square.from_board_str_index(move_to(move))
+
+    def king_square(self, color):
+        return self._king_squares[color]
+
+    def piece_at(self, index: int) -> None | Piece:
+        return self._squares[index]
+
+    def pieces(self, color=None):
+        """(square index, piece) pairs for ``color`` (both sides by default), visiting occupied squares only."""
+        occupancy = self.occupancy(color)
+
+        return [(index, self._squares[index]) for index in iter_bits(occupancy)]
+
+    def bitboard(self, color, kind):
+        return self._bitboards[color * 6 + kind]
+
+    def occupancy(self, color=None):
+        if color is None:
+            return self._occupancy[USR_WHITE] | self._occupancy[USR_BLACK]
+
+        return self._occupancy[color]
+
+    def str_to_board(self, brd):
+        if len(brd) != 64:
+            raise PositionException("Invalid string to board conversion, got len = " + str(len(brd)))
+
+        self._bitboards = [0] * 12
+        self._occupancy = [0, 0]
+        self._squares = [None] * 64
+        self._king_squares = [None, None]
+        self.hash = 0
+        self._legal_cache_hash = None
+
+        for index, short in enumerate(brd):
+            piece = PIECES_BY_SHORT.get(short)
+
+            if piece is not None:
+                self._put_piece(index, piece)
+
+    def _load_fen(self, fen: str):
+        fields = fen.split()
+
+        if not 4 <= len(fields) <= 6:
+            raise PositionException(f"Invalid FEN, expected 4 to 6 fields: {fen}")
+
+        placement, turn, castling, en_passant = fields[:4]
+        squares, bitboards, occupancy = self._squares, self._bitboards, self._occupancy
+        piece_hash = 0
+        ranks = placement.split("/")
+
+        if len(ranks) != 8:
+            raise PositionException(f"Invalid FEN placement, expected 8 ranks: {placement}")
+
+        for rank, row in zip(range(7, -1, -1), ranks):
+            index = rank * 8
+
+            for char in row:
+                if char in "12345678":
+                    index += ord(char) - 48
+                    continue
+
+                piece = _FEN_PIECES.get(char)
+                if piece is None or index >= rank * 8 + 8:
+                    raise PositionException(f"Invalid FEN placement: {placement}")
+
+                squares[index] = piece
+                bitboards[piece.code] |= 1 << index
+                occupancy[piece.color] |= 1 << index
+                piece_hash ^= PIECE_KEYS[piece.code][index]
+                if piece.kind == KING:
+                    self._king_squares[piece.color] = index
+                index += 1
+
+            if index != rank * 8 + 8:
+                raise PositionException(f"Invalid FEN placement: {placement}")
+
+        if turn not in ("w", "b"):
+            raise PositionException(f"Invalid FEN side to move: {turn}")
+        self.turn = USR_WHITE if turn == "w" else USR_BLACK
+
+        # pawns away from their home rank have moved; kings and rooks count as unmoved only for castling rights
+        unmoved = FULL & ~(bitboards[USR_WHITE * 6 + PAWN] & ~_WHITE_PAWN_RANK) \
+            & ~(bitboards[USR_BLACK * 6 + PAWN] & ~_BLACK_PAWN_RANK)
+        for color in (USR_WHITE, USR_BLACK):
+            unmoved &= ~(bitboards[color * 6 + KING] | bitboards[color * 6 + ROOK])
+
+        if castling != "-":
+            for char in castling:
+                if char not in _FEN_CASTLING:
+                    raise PositionException(f"Invalid FEN castling rights: {castling}")
+
+                color, king, rook = _FEN_CASTLING[char]
+                # rights without the pieces on their squares are ignored, as many test suites carry stale ones
+                if bitboards[color * 6 + KING] >> king & 1 and bitboards[color * 6 + ROOK] >> rook & 1:
+                    unmoved |= (1 << king) | (1 << rook)
+
+        self._unmoved = unmoved
+
+        if en_passant != "-":
+            index = SQUARE_INDEX.get(en_passant)
+            if index is None or en_passant[1] not in "36":
+                raise PositionException(f"Invalid FEN en-passant square: {en_passant}")
+            self.en_passant = self._root_en_passant = index
+
+        try:
+            self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+            self.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise PositionException(f"Invalid FEN move counters: {fen}")
+
+        # the clock is kept per ply in a 16-bit array
+        if not 0 <= self.halfmove_clock <= 0xFFFF or self.fullmove_number < 1:
+            raise PositionException(f"Invalid FEN move counters: {fen}")
+
+        self.hash = piece_hash ^ self._state_hash()
+
+    def fen(self):
+        rows = []
+
+        for rank in range(7, -1, -1):
+            row, empty = "", 0
+
+            for piece in self._squares[rank * 8:rank * 8 + 8]:
+                if piece is None:
+                    empty += 1
+                    continue
+
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += piece.short.swapcase()
+
+            rows.append(row + str(empty) if empty else row)
+
+        castling = ""
+        rooks = self._castling_rooks()
+        for char, (color, king, rook) in _FEN_CASTLING.items():
+            if rooks >> rook & 1 and self._king_squares[color] == king:
+                castling += char
+
+        # FEN can only hold a square on the third or sixth rank; like the hash, it is left out unless a pawn can
+        # take there (board strings let pawns off their home rank double push too)
+        en_passant = "-"
+        if self.en_passant is not None and self.en_passant // 8 in (2, 5) and self._en_passant_key():
+            en_passant = SQUARE_NAMES[self.en_passant]
+
+        return f"{'/'.join(rows)} {'w' if self.turn == USR_WHITE else 'b'} {castling or '-'} {en_passant} " \
+               f"{self.halfmove_clock} {self.fullmove_number}"
+
+    def _put_piece(self, index: int, piece: Piece):
+        bb = 1 << index
+
+        self._squares[index] = piece
+        self._bitboards[piece.code] |= bb
+        self._occupancy[piece.color] |= bb
+        self.hash ^= PIECE_KEYS[piece.code][index]
+
+        if piece.kind == KING:
+            self._king_squares[piece.color] = index
+
+    def _remove_piece(self, index: int):
+        piece = self._squares[index]
+        bb = 1 << index
+
+        self._squares[index] = None
+        self._bitboards[piece.code] ^= bb
+        self._occupancy[piece.color] ^= bb
+        self.hash ^= PIECE_KEYS[piece.code][index]
+
+        if piece.kind == KING:
+            self._king_squares[piece.color] = None
+
+        return piece
+
+    def _castling_rooks(self):
+        """Unmoved rooks whose king is unmoved too, i.e. the castling rights still held."""
+        rooks = 0
+
+        for color in (USR_WHITE, USR_BLACK):
+            king = self._king_squares[color]
+            if king is not None and self._unmoved >> king & 1:
+                rooks |= self._bitboards[color * 6 + ROOK] & self._unmoved
+
+        return rooks
+
+    def _en_passant_key(self):
+        """Hash key of the en-passant square, only counted while a pawn of the side to move can take there."""
+        if self.en_passant is None:
+            return 0
+
+        if not PAWN_ATTACKS[self.turn ^ 1][self.en_passant] & self._bitboards[self.turn * 6 + PAWN]:
+            return 0
+
+        return EN_PASSANT_KEYS[self.en_passant % 8]
+
+    def compute_hash(self):
+        """Zobrist hash of the position built from scratch; ``hash`` holds the incrementally updated value."""
+        res = self._state_hash()
+
+        for index, piece in self.pieces():
+            res ^= PIECE_KEYS[piece.code][index]
+
+        return res
+
+    def _state_hash(self):
+        """Hash keys of everything but the pieces: castling rights, side to move and en-passant file."""
+        res = 0
+
+        for index in iter_bits(self._castling_rooks()):
+            res ^= CASTLING_KEYS[index]
+
+        if self.turn == USR_BLACK:
+            res ^= SIDE_KEY
+
+        return res ^ self._en_passant_key()
+
+    def has_been_moved(self, square: Square):
+        return self._has_been_moved(square.index)
+
+    def _has_been_moved(self, index: int):
+        return not self._unmoved >> index & 1
+
+    def _is_attacked(self, index: int, by):
+        return is_attacked(self._bitboards, self._occupancy[0] | self._occupancy[1], index, by)
+
+    def _attackers_bb(self, index: int, by):
+        offset = by * 6
+        occupancy = self._occupancy[0] | self._occupancy[1]
+        diagonal = (self._bitboards[offset + BISHOP] | self._bitboards[offset + QUEEN]) & BISHOP_RAYS[index]
+        straight = (self._bitboards[offset + ROOK] | self._bitboards[offset + QUEEN]) & ROOK_RAYS[index]
+
+        attackers = PAWN_ATTACKS[by ^ 1][index] & self._bitboards[offset + PAWN] \
+            | KNIGHT_ATTACKS[index] & self._bitboards[offset + KNIGHT] \
+            | KING_ATTACKS[index] & self._bitboards[offset + KING]
+
+        if diagonal:
+            attackers |= bishop_attacks(index, occupancy) & diagonal
+        if straight:
+            attackers |= rook_attacks(index, occupancy) & straight
+
+        return attackers
+
+    def attackers(self, square: Square, by):
+        if by not in [USR_WHITE, USR_BLACK]:
+            raise PositionException("Invalid attacking user")
+
+        attackers_bb = self._attackers_bb(square.index, by)
+        return [Square.from_board_str_index(index) for index in iter_bits(attackers_bb)]
+
+    def _castle_rook(self, index: int, dx: int):
+        """Square of the rook the king on ``index`` castles with when moving ``dx`` files, or None."""
+        piece = self._squares[index]
+        x = index % 8
+
+        if piece is None or piece.kind != KING or abs(dx) != 2 or not 0 <= x + dx < 8:
+            return None
+
+        if self._has_been_moved(index):
+            return None
+
+        opponent = piece.color ^ 1
+
+        if self._is_attacked(index, opponent):
+            return None
+
+        for over_index in RAY_SQUARES[EAST if dx > 0 else WEST][index]:
+            over_piece = self._squares[over_index]
+
+            # the king may not pass through attacked squares, the rest of the way only needs to be empty
+            if over_piece is None and (abs(over_index - index) > 2 or not self._is_attacked(over_index, opponent)):
+                continue
+            if over_piece is not None and over_piece.kind == ROOK and over_piece.color == piece.color:
+                if not self._has_been_moved(over_index) and over_index != index + dx:
+                    return over_index
+
+            return None
+        return None
+
+    def _first_piece_on_rank(self, index: int, step: int):
+        for over_index in RAY_SQUARES[EAST if step > 0 else WEST][index]:
+            if self._squares[over_index] is not None:
+                return over_index
+
+        return None
+
+    def _generate_piece_moves(self, index: int, moves: list[int]):
+        piece = self._squares[index]
+        color = piece.color
+
+        own = self._occupancy[color]
+        enemy = self._occupancy[color ^ 1]
+        occupancy = own | enemy
+        kind = piece.kind
+
+        if kind == PAWN:
+            direction = 8 if color == USR_WHITE else -8
+
+            to_index = index + direction
+            if 0 <= to_index < 64 and not occupancy >> to_index & 1:
+                if (1 << to_index) & PROMOTION_RANKS:
+                    _add_promotions(moves, index, to_index, PROMOTION)
+                else:
+                    moves.append(encode_move(index, to_index))
+
+                to_index += direction
+                if 0 <= to_index < 64 and not occupancy >> to_index & 1 and not self._has_been_moved(index):
+                    moves.append(encode_move(index, to_index, DOUBLE_PAWN_PUSH))
+
+            attacks = PAWN_ATTACKS[color][index]
+            for to_index in iter_bits(attacks & enemy):
+                if (1 << to_index) & PROMOTION_RANKS:
+                    _add_promotions(moves, index, to_index, PROMOTION | CAPTURE)
+                else:
+                    moves.append(encode_move(index, to_index, CAPTURE))
+
+            en_passant = self.en_passant
+            if en_passant is not None and attacks >> en_passant & 1:
+                passed = self._squares[en_passant - direction]
+                if passed is not None and passed.color != color:
+                    moves.append(encode_move(index, en_passant, EN_PASSANT))
+            return
+
+        if kind == KNIGHT:
+            attacks = KNIGHT_ATTACKS[index]
+        elif kind == BISHOP:
+            attacks = bishop_attacks(index, occupancy)
+        elif kind == ROOK:
+            attacks = rook_attacks(index, occupancy)
+        elif kind == QUEEN:
+            attacks = queen_attacks(index, occupancy)
+        elif kind == KING:
+            attacks = KING_ATTACKS[index]
+
+            if self._castle_rook(index, 2) is not None:
+                moves.append(encode_move(index, index + 2, KING_CASTLE))
+            if self._castle_rook(index, -2) is not None:
+                moves.append(encode_move(index, index - 2, QUEEN_CASTLE))
+        else:
+            raise PositionException("Invalid piece on square. Cannot compute moves.")
+
+        for to_index in iter_bits(attacks & ~occupancy):
+            moves.append(encode_move(index, to_index))
+        for to_index in iter_bits(attacks & enemy):
+            moves.append(encode_move(index, to_index, CAPTURE))
+
+    def pseudo_legal_moves(self, color=None):
+        if color is None:
+            color = self.turn
+
+        moves = []
+        for index in iter_bits(self._occupancy[color]):
+            self._generate_piece_moves(index, moves)
+
+        return moves
+
+    def _pins(self, king: int, color):
+        """Map of each pinned piece's square to the pin ray it may still move along (pinner included)."""
+        pins = {}
+
+        own = self._occupancy[color]
+        occupancy = own | self._occupancy[color ^ 1]
+        offset = (color ^ 1) * 6
+        queens = self._bitboards[offset + QUEEN]
+        diagonal = (self._bitboards[offset + BISHOP] | queens) & BISHOP_RAYS[king]
+        straight = (self._bitboards[offset + ROOK] | queens) & ROOK_RAYS[king]
+
+        for directions, sliders in ((BISHOP_DIRECTION_INDICES, diagonal), (ROOK_DIRECTION_INDICES, straight)):
+            if not sliders:
+                continue
+
+            for direction in directions:
+                blocker = ray_attacks(king, direction, occupancy) & own
+                if not blocker:
+                    continue
+
+                ray = ray_attacks(king, direction, occupancy ^ blocker)
+                if ray & sliders:
+                    pins[lsb(blocker)] = ray
+
+        return pins
+
+    def legal_moves(self, color=None):
+        """
+        Legal moves for ``color`` (the side to move by default), generated once per position and color and
+        shared between callers, hence the tuple.
+        """
+        if color is None:
+            color = self.turn
+
+        if self._legal_cache_hash != self.hash:
+            self._legal_cache_hash = self.hash
+            self._legal_cache = [None, None]
+
+        moves = self._legal_cache[color]
+        if moves is None:
+            moves = self._legal_cache[color] = tuple(self.generate_legal_moves(color))
+
+        return moves
+
+    def generate_legal_moves(self, color=None):
+        """
+        Uncached ``legal_moves``. Checkers and pinned pieces are found once and moves are filtered against the
+        resulting masks; only en-passant captures are tried on a copy.
+        """
+        if color is None:
+            color = self.turn
+
+        king = self._king_squares[color]
+        if king is None:
+            return self.pseudo_legal_moves(color)
+
+        opponent = color ^ 1
+        checkers = self._attackers_bb(king, opponent)
+
+        if checkers & (checkers - 1):
+            # double check, only the king can move
+            candidates = []
+            self._generate_piece_moves(king, candidates)
+        else:
+            candidates = self.pseudo_legal_moves(color)
+
+        check_mask = checkers | BETWEEN[king][lsb(checkers)] if checkers else FULL
+        pins = self._pins(king, color)
+        king_free_occupancy = (self._occupancy[0] | self._occupancy[1]) ^ (1 << king)
+
+        moves = []
+        for move in candidates:
+            from_index, to_index, flag = move & 0x3F, (move >> 6) & 0x3F, move >> 12
+
+            if from_index == king:
+                if flag == KING_CASTLE or flag == QUEEN_CASTLE \
+                        or not is_attacked(self._bitboards, king_free_occupancy, to_index, opponent):
+                    moves.append(move)
+            elif flag == EN_PASSANT:
+                if self.is_legal(move):
+                    moves.append(move)
+            elif check_mask >> to_index & 1 and (from_index not in pins or pins[from_index] >> to_index & 1):
+                moves.append(move)
+
+        return moves
+
+    def _move_bits(self, bitboards: list[int], occupancy: list[int], move: int):
+        """Apply ``move`` to the given bitboards, reading the pieces involved from the (unchanged) mailbox."""
+        from_index, to_index, flag = move & 0x3F, (move >> 6) & 0x3F, move >> 12
+
+        piece = self._squares[from_index]
+        color = piece.color
+        offset = color * 6
+
+        if flag & CAPTURE:
+            captured_index = to_index if flag != EN_PASSANT else to_index - (8 if color == USR_WHITE else -8)
+            captured = self._squares[captured_index]
+            bb = 1 << captured_index
+
+            bitboards[captured.code] ^= bb
+            occupancy[captured.color] ^= bb
+
+        bb = (1 << from_index) | (1 << to_index)
+        if flag & PROMOTION:
+            bitboards[offset + PAWN] ^= 1 << from_index
+            bitboards[offset + KNIGHT + (flag & 0x3)] ^= 1 << to_index
+        else:
+            bitboards[offset + piece.kind] ^= bb
+        occupancy[color] ^= bb
+
+        if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+            step = 1 if flag == KING_CASTLE else -1
+            bb = (1 << self._first_piece_on_rank(from_index, step)) | (1 << (to_index - step))
+
+            bitboards[offset + ROOK] ^= bb
+            occupancy[color] ^= bb
+
+    def is_legal(self, move: int):
+        """Whether the pseudo-legal ``move`` leaves its own king out of check."""
+        from_index = move & 0x3F
+        color = self._squares[from_index].color
+
+        king = self._king_squares[color]
+        if king is None:
+            return True
+        if king == from_index:
+            king = (move >> 6) & 0x3F
+
+        bitboards = self._bitboards.copy()
+        occupancy = self._occupancy.copy()
+        self._move_bits(bitboards, occupancy, move)
+
+        return not is_attacked(bitboards, occupancy[0] | occupancy[1], king, color ^ 1)
+
+    def _touched_squares(self, move: int, rook_index: int):
+        """Squares whose content ``move`` changes, in the order their unmoved bits are kept in undo records."""
+        from_index, to_index, flag = move & 0x3F, (move >> 6) & 0x3F, move >> 12
+
+        if flag == KING_CASTLE:
+            return from_index, to_index, rook_index, to_index - 1
+        if flag == QUEEN_CASTLE:
+            return from_index, to_index, rook_index, to_index + 1
+        if flag == EN_PASSANT:
+            return from_index, to_index, to_index - 8 if to_index > from_index else to_index + 8
+
+        return from_index, to_index
+
+    def make_move(self, move: int):
+        """
+        Play ``move`` and push its undo record: bits 0-3 hold the captured piece's code + 1 (0 for none), bits
+        4-9 the castling rook's square and bits 10-13 which of the touched squares were still unmoved. The
+        en-passant square before the move is implied by the previous move.
+        """
+        from_index, to_index, flag = move & 0x3F, (move >> 6) & 0x3F, move >> 12
+
+        self._hashes.append(self.hash)
+        self._clocks.append(self.halfmove_clock)
+        castling_rooks = self._castling_rooks()
+        self.hash ^= self._en_passant_key()
+
+        record = 0
+        rook_index = 0
+
+        if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+            step = 1 if flag == KING_CASTLE else -1
+            rook_index = self._first_piece_on_rank(from_index, step)
+
+            self._put_piece(to_index - step, self._remove_piece(rook_index))
+            record = rook_index << 4
+        elif flag == EN_PASSANT:
+            record = self._remove_piece(to_index - 8 if to_index > from_index else to_index + 8).code + 1
+        elif flag & CAPTURE:
+            record = self._remove_piece(to_index).code + 1
+
+        piece = self._remove_piece(from_index)
+        self._put_piece(to_index, PIECES[piece.color * 6 + KNIGHT + (flag & 0x3)] if flag & PROMOTION else piece)
+
+        # saturates rather than overflow the 16-bit clock history; any count past 100 is a draw all the same
+        self.halfmove_clock = 0 if flag & CAPTURE or piece.kind == PAWN else min(self.halfmove_clock + 1, 0xFFFF)
+
+        for i, index in enumerate(self._touched_squares(move, rook_index)):
+            if self._unmoved >> index & 1:
+                self._unmoved ^= 1 << index
+                record |= 1 << (10 + i)
+
+        self.history.append(move)
+        self._undo_records.append(record)
+
+        self.en_passant = (from_index + to_index) // 2 if flag == DOUBLE_PAWN_PUSH else None
+        if self.turn == USR_BLACK:
+            self.fullmove_number += 1
+        self.turn ^= 1
+
+        self.hash ^= SIDE_KEY ^ self._en_passant_key()
+        for index in iter_bits(castling_rooks ^ self._castling_rooks()):
+            self.hash ^= CASTLING_KEYS[index]
+
+    def unmake_move(self):
+        move, record = self.history.pop(), self._undo_records.pop()
+        from_index, to_index, flag = move & 0x3F, (move >> 6) & 0x3F, move >> 12
+        rook_index = (record >> 4) & 0x3F
+
+        for i, index in enumerate(self._touched_squares(move, rook_index)):
+            if record >> (10 + i) & 1:
+                self._unmoved |= 1 << index
+
+        self.turn ^= 1
+        if self.turn == USR_BLACK:
+            self.fullmove_number -= 1
+        piece = self._remove_piece(to_index)
+        self._put_piece(from_index, PIECES[piece.color * 6 + PAWN] if flag & PROMOTION else piece)
+
+        if flag == KING_CASTLE or flag == QUEEN_CASTLE:
+            rook_to = to_index - (1 if flag == KING_CASTLE else -1)
+            self._put_piece(rook_index, self._remove_piece(rook_to))
+        elif flag == EN_PASSANT:
+            self._put_piece(to_index - 8 if to_index > from_index else to_index + 8, PIECES[(record & 0xF) - 1])
+        elif record & 0xF:
+            self._put_piece(to_index, PIECES[(record & 0xF) - 1])
+
+        self.en_passant = self._root_en_passant if not self.history else None
+        if self.history and self.history[-1] >> 12 == DOUBLE_PAWN_PUSH:
+            previous = self.history[-1]
+            self.en_passant = ((previous & 0x3F) + ((previous >> 6) & 0x3F)) // 2
+
+        self.hash = self._hashes.pop()
+        self.halfmove_clock = self._clocks.pop()
+        return move
+
+    def _moves_from(self, square: Square):
+        """Moves of the piece on ``square``, promotions to a queen only as the board always picks one."""
+        moves = []
+
+        if self[square] is not None:
+            self._generate_piece_moves(square.index, moves)
+
+        return [move for move in moves if not _is_under_promotion(move)]
+
+    def get_move_squares(self, square: Square):
+        return [Square.from_board_str_index(move_to(move)) for move in self._moves_from(square)
+                if not is_capture(move)]
+
+    def get_capture_squares(self, square: Square):
+        return [Square.from_board_str_index(move_to(move)) for move in self._moves_from(square)
+                if is_capture(move)]
+
+    def move_piece(self, from_square: Square, to_square: Square, reset_redo_history=True):
+        piece = self[from_square]
+
+        if piece is None:
+            raise PositionException(f"No piece to move on {from_square}")
+
+        if self[to_square] is not None:
+            raise PositionException(f"Piece on {to_square}. Cannot move to occupied square")
+
+        from_index, to_index = from_square.index, to_square.index
+        flag = QUIET
+
+        if piece.kind == KING and to_square.y == from_square.y \
+                and self._castle_rook(from_index, to_square.x - from_square.x) is not None:
+            flag = KING_CASTLE if to_index > from_index else QUEEN_CASTLE
+        elif piece.kind == PAWN and abs(to_index - from_index) == 16:
+            flag = DOUBLE_PAWN_PUSH
+        elif piece.kind == PAWN and (1 << to_index) & PROMOTION_RANKS:
+            # the board has no piece picker, always promote to a queen
+            flag = QUEEN_PROMOTION
+
+        self._play(encode_move(from_index, to_index, flag), reset_redo_history)
+
+    def capture_piece(self, from_square, to_square, reset_redo_history=True):
+        piece = self[from_square]
+
+        if piece is None:
+            raise PositionException(f"No piece to move on {from_square}")
+
+        from_index, to_index = from_square.index, to_square.index
+
+        if self[to_square] is None:
+            # check for en-passant
+            if encode_move(from_index, to_index, EN_PASSANT) not in self._moves_from(from_square):
+                raise PositionException(f"Invalid capture on {to_square}")
+
+            move = encode_move(from_index, to_index, EN_PASSANT)
+        elif piece.kind == PAWN and (1 << to_index) & PROMOTION_RANKS:
+            move = encode_move(from_index, to_index, QUEEN_PROMOTION | CAPTURE)
+        else:
+            move = encode_move(from_index, to_index, CAPTURE)
+
+        self._play(move, reset_redo_history)
+
+    def play(self, move: int):
+        self._play(move, True)
+
+    def _play(self, move: int, reset_redo_history: bool):
+        self.make_move(move)
+
+        if reset_redo_history:
+            del self.redo_history[:]
+
+    def position_at(self, ply: int):
+        """A new position holding this game after its first ``ply`` moves, replayed from the starting setup."""
+        if not 0 <= ply <= len(self.history):
+            raise PositionException(f"Invalid ply {ply}, game has {len(self.history)}")
+
+        position = Position(self.config)
+        for move in self.history[:ply]:
+            position.make_move(move)
+
+        return position
+
+    def history_size(self):
+        """Bytes taken by the move history, undo records and redo moves (14 bytes per ply plus array headers)."""
+        return sum(sys.getsizeof(a) for a in (self.history, self.redo_history, self._undo_records, self._clocks,
+                                              self._hashes))
+
+    def is_fifty_move_draw(self):
+        return self.halfmove_clock >= 100
+
+    def repetition_count(self):
+        """
+        Times the current position has occurred. Only positions since the last capture or pawn move can repeat,
+        so at most the last ``halfmove_clock`` hashes (fewer than a hundred in any undrawn game) are compared.
+        """
+        hashes = self._hashes
+        count = 1
+
+        for i in range(len(hashes) - 2, max(len(hashes) - self.halfmove_clock, 0) - 1, -2):
+            if hashes[i] == self.hash:
+                count += 1
+
+        return count
+
+    def is_threefold_repetition(self):
+        return self.repetition_count() >= 3
+
+    def is_insufficient_material(self):
+        """Neither side can mate: bare kings plus at most one minor piece, or only bishops all on one color."""
+        bitboards = self._bitboards
+        white, black = USR_WHITE * 6, USR_BLACK * 6
+
+        for kind in (PAWN, ROOK, QUEEN):
+            if bitboards[white + kind] | bitboards[black + kind]:
+                return False
+
+        knights = bitboards[white + KNIGHT] | bitboards[black + KNIGHT]
+        bishops = bitboards[white + BISHOP] | bitboards[black + BISHOP]
+
+        if not knights:
+            return not bishops & LIGHT_SQUARES or not bishops & DARK_SQUARES
+
+        return not bishops and knights.bit_count() == 1
+
+    def undo(self, redoable=True):
+        if len(self.history) > 0:
+            move = self.unmake_move()
+            if redoable:
+                self.redo_history.append(move)
+            return True
+        return False
+
+    def redo(self):
+        if len(self.redo_history) > 0:
+            self.make_move(self.redo_history.pop())
+            return True
+        return False
+
+    def get_king_position(self, color):
+        if color not in [USR_WHITE, USR_BLACK]:
+            raise PositionException("Invalid color type")
+
+        king = self._king_squares[color]
+        if king is None:
+            raise PositionException("No king on the board for color " + str(color))
+
+        return Square.from_board_str_index(king)
+
+    def in_check(self, color=None):
+        """Whether ``color`` (the side to move by default) is in check; False without a king on the board."""
+        if color is None:
+            color = self.turn
+
+        king = self._king_squares[color]
+        return king is not None and self._is_attacked(king, color ^ 1)
+
+    def on_check(self, color):
+        king_square = self.get_king_position(color)
+        return self._is_attacked(king_square.index, color ^ 1)
+
+    def get_safe_squares(self, square: Square):
+        """Quiet and capture destinations of the legal moves of the piece on ``square``."""
+        piece = self[square]
+
+        if piece is None:
+            raise PositionException(f"Piece must be on square {square} to evaluate its safe moves")
+
+        index = square.index
+        moves, captures = [], []
+
+        for move in self.legal_moves(piece.color):
+            if move_from(move) == index and not _is_under_promotion(move):
+                (captures if is_capture(move) else moves).append(Square.from_board_str_index(move_to(move)))
+
+        return moves, captures
+
+    def get_safe_move_squares(self, square: Square):
+        return self.get_safe_squares(square)[0]
+
+    def get_safe_capture_squares(self, square: Square):
+        return self.get_safe_squares(square)[1]
+
+    def has_possible_move(self, color):
+        return len(self.legal_moves(color)) > 0
@@ -0,0 +1,259 @@
+"""
+On-disk index from position hashes to the games and plies where the positions occur. It is built in one
+streaming pass over PGN files or game archives: postings are sorted in bounded runs spilled to temporary files and
+merged at the end. Queries binary search the memory-mapped file, so opening an index reads nothing up front.
+
+Layout (native byte order, recorded in the header)::
+
+    header    b"CPYX" version:u8 little_endian:u8 reserved:u16 count:u64
+    postings  (hash:u64 game << 16 | ply:u64)[count], sorted
+"""
+import argparse
+import heapq
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from ..constants import *
+from .position import Position, PositionException
+from .archive import iter_games
+
+MAGIC = b"CPYX"
+VERSION = 1
+
+_HEADER = struct.Struct("=4sBBHQ")
+# postings per sorted run held in memory while building, about 70 bytes each while the run is sorted
+_RUN_SIZE = 1 << 20
+_MERGE_CHUNK = 1 << 15
+
+
+class PositionIndexException(Exception):
+    pass
+
+
+def _game_postings(game, game_id: int, postings: array):
+    position = game.position
+
+    if position is not None:
+        # a PGN game was already replayed while it was read, its position keeps the hash before every move
+        hashes = position._hashes
+    else:
+        fen = game.headers.get("FEN")
+
+        try:
+            position = Position(fen) if fen else Position(START_CONFIG)
+        except PositionException:
+            return
+
+        for move in game.moves:
+            position.make_move(move)
+        hashes = position._hashes
+
+    for ply, key in enumerate(hashes):
+        postings.extend((key, game_id << 16 | ply))
+    postings.extend((position.hash, game_id << 16 | len(hashes)))
+
+
+def _sorted_run(postings: array):
+    """Postings packed as ``hash << 64 | posting`` ints and sorted; one int per posting keeps the sort lean."""
+    return sorted(key << 64 | posting for key, posting in zip(postings[0::2], postings[1::2]))
+
+
+def _write_packed(packed, file):
+    data = array('Q', b"".join(value.to_bytes(16, "big") for value in packed))
+
+    if sys.byteorder == "little":
+        data.byteswap()
+
+    data.tofile(file)
+
+
+def _read_run(path: str):
+    with open(path, "rb") as file:
+        while True:
+            chunk = array('Q')
+            chunk.frombytes(file.read(_MERGE_CHUNK * 16))
+
+            if not chunk:
+                return
+
+            yield from (key << 64 | posting for key, posting in zip(chunk[0::2], chunk[1::2]))
+
+
+def build_index(sources, path: str, run_size=_RUN_SIZE):
+    """Index every position of the games in ``sources`` (PGN files or archives, numbered across all of them)."""
+    postings = array('Q')
+    run_paths = []
+    games = 0
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as run_dir:
+        for source in sources:
+            for game in iter_games(source):
+                _game_postings(game, games, postings)
+                games += 1
+
+                if len(postings) >= run_size * 2:
+                    run_paths.append(os.path.join(run_dir, f"run{len(run_paths)}"))
+                    with open(run_paths[-1], "wb") as file:
+                        _write_packed(_sorted_run(postings), file)
+                    postings = array('Q')
+
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", 0, 0))
+            count = 0
+
+            if not run_paths:
+                _write_packed(_sorted_run(postings), file)
+                count = len(postings) // 2
+            else:
+                runs = [_read_run(run_path) for run_path in run_paths]
+                runs.append(_sorted_run(postings))
+
+                out = []
+                for packed in heapq.merge(*runs):
+                    out.append(packed)
+
+                    if len(out) >= _MERGE_CHUNK:
+                        _write_packed(out, file)
+                        count += len(out)
+                        out = []
+
+                _write_packed(out, file)
+                count += len(out)
+
+            file.seek(0)
+            file.write(_HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", 0, count))
+
+    return games, count
+
+
+class PositionIndex:
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        header = self._file.read(_HEADER.size)
+
+        if len(header) < _HEADER.size:
+            raise PositionIndexException(f"{path} is not a position index")
+
+        magic, version, little_endian, _, self.count = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise PositionIndexException(f"{path} is not a version {VERSION} position index")
+        if little_endian != (sys.byteorder == "little"):
+            raise PositionIndexException(f"{path} was built on a machine of the other byte order")
+
+        self._map = None
+        self._postings = memoryview(b"").cast('Q')
+
+        if self.count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._postings = memoryview(self._map)[_HEADER.size:_HEADER.size + self.count * 16].cast('Q')
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _lower_bound(self, key: int):
+        postings = self._postings
+        low, high = 0, self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            if postings[2 * middle] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def lookup(self, key: int, limit=None):
+        """(game, ply) of each occurrence of the position hashed to ``key``, in game order."""
+        postings = self._postings
+        i = self._lower_bound(key)
+        found = []
+
+        while i < self.count and postings[2 * i] == key and (limit is None or len(found) < limit):
+            posting = postings[2 * i + 1]
+            found.append((posting >> 16, posting & 0xFFFF))
+            i += 1
+
+        return found
+
+    def lookup_position(self, position: Position, limit=None):
+        return self.lookup(position.hash, limit)
+
+    def close(self):
+        # views into the map have to be released before it can be closed
+        self._postings.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query an index of the positions in a game collection.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="index the games of PGN files and game archives")
+    build.add_argument("index")
+    build.add_argument("files", nargs="+", help="PGN files or game archives")
+    build.add_argument("--run-size", type=int, default=_RUN_SIZE, help="postings sorted in memory at once")
+
+    query = commands.add_parser("query", help="list the games reaching a position")
+    query.add_argument("index")
+    query.add_argument("fen", nargs="?", default=None, help="position, the start position if omitted")
+    query.add_argument("-n", "--limit", type=int, default=20, help="occurrences to print")
+
+    bench = commands.add_parser("bench", help="time lookups of random indexed positions")
+    bench.add_argument("index")
+    bench.add_argument("-n", "--lookups", type=int, default=100000)
+
+    args = parser.parse_args(argv)
+
+    match args.command:
+        case "build":
+            start = time.perf_counter()
+            games, count = build_index(args.files, args.index, args.run_size)
+            elapsed = time.perf_counter() - start
+
+            print(f"games {games}  positions {count}  time {elapsed:.3f}s  "
+                  f"positions/s {int(count / elapsed) if elapsed else 0}")
+        case "query":
+            position = Position(args.fen) if args.fen else Position(START_CONFIG)
+
+            with PositionIndex(args.index) as index:
+                start = time.perf_counter()
+                found = index.lookup_position(position)
+                elapsed = time.perf_counter() - start
+
+            for game, ply in found[:args.limit]:
+                print(f"game {game} ply {ply}")
+            print(f"occurrences {len(found)}  time {elapsed * 1e6:.1f}us")
+        case "bench":
+            with PositionIndex(args.index) as index:
+                if not index.count:
+                    print("empty index")
+                    return
+
+                keys = [index._postings[2 * random.randrange(index.count)] for _ in range(args.lookups)]
+
+                start = time.perf_counter()
+                for key in keys:
+                    index.lookup(key, 1)
+                elapsed = time.perf_counter() - start
+
+            print(f"lookups {args.lookups}  positions {index.count}  time {elapsed:.3f}s  "
+                  f"per lookup {elapsed / args.lookups * 1e6:.2f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+import argparse
+import time
+
+from ..constants import *
+from .position import Position
+from .perft import load_position
+from .move import *
+from .evaluate import evaluate
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+MATE = 30000
+INFINITY = 32000
+MAX_PLY = 64
+# scores at least this far from zero are mates found within MAX_PLY plies
+MATE_BOUND = MATE - MAX_PLY
+
+_TT_MOVE_SCORE = 1 << 30
+_CAPTURE_SCORE = 1 << 28
+_KILLER_SCORE = 1 << 27
+_HISTORY_LIMIT = 1 << 20
+# nodes between clock and stop checks minus one, a few milliseconds at this engine's speed
+_CHECK_MASK = 0x3F
+
+
+class SearchException(Exception):
+    pass
+
+
+def _to_table(value: int, ply: int):
+    """Mate scores are stored relative to the node rather than the root."""
+    if value >= MATE_BOUND:
+        return value + ply
+    if value <= -MATE_BOUND:
+        return value - ply
+    return value
+
+
+def _from_table(value: int, ply: int):
+    if value >= MATE_BOUND:
+        return value - ply
+    if value <= -MATE_BOUND:
+        return value + ply
+    return value
+
+
+class SearchInfo:
+    """Outcome of one completed iteration of the search."""
+
+    def __init__(self, depth: int, score: int, pv: list[int], nodes: int, elapsed: float):
+        self.depth = depth
+        self.score = score
+        self.pv = pv
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return f"depth {self.depth}  score {self.score_text()}  nodes {self.nodes}  time {self.elapsed:.3f}s  " \
+               f"nps {self.nps}  pv {' '.join(move_to_uci(move) for move in self.pv)}"
+
+    @property
+    def best_move(self):
+        return self.pv[0] if self.pv else 0
+
+    @property
+    def nps(self):
+        return int(self.nodes / self.elapsed) if self.elapsed else 0
+
+    def score_text(self):
+        """UCI style score, ``cp <centipawns>`` or ``mate <moves>`` (negative when getting mated)."""
+        if self.score >= MATE_BOUND:
+            return f"mate {(MATE - self.score + 1) // 2}"
+        if self.score <= -MATE_BOUND:
+            return f"mate {-(MATE + self.score) // 2}"
+        return f"cp {self.score}"
+
+
+class Searcher:
+    """
+    Iterative deepening alpha-beta (negamax) over a transposition table, with a capture-only quiescence
+    search and moves ordered by table move, MVV-LVA captures, killer moves and the history heuristic.
+    """
+
+    def __init__(self, table: TranspositionTable | None = None, stop_event=None):
+        self.table = table if table is not None else TranspositionTable()
+        self.nodes = 0
+        self.stopped = False
+        # threading/multiprocessing Event that aborts the search from another thread or process
+        self.stop_event = stop_event
+
+        self._deadline = None
+        self._node_limit = None
+        self._root_move = 0
+        self._killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        # indexed by side to move, then by the move's from/to bits
+        self._history = [[0] * 4096, [0] * 4096]
+
+    def stop(self):
+        """Abort a running search; ``search`` returns the last completed iteration."""
+        self.stopped = True
+
+    def search(self, position: Position, depth=MAX_PLY, time_limit: float | None = None,
+               node_limit: int | None = None, on_iteration=None, start_depth=1):
+        """
+        Search ``position`` one ply deeper at a time, from ``start_depth``, until ``depth``, ``time_limit``
+        seconds or ``node_limit`` nodes run out, calling ``on_iteration`` with each completed iteration's
+        SearchInfo. Returns the last one, or None when the side to move has no legal move.
+        """
+        moves = position.generate_legal_moves()
+        if not moves:
+            return None
+
+        start = time.perf_counter()
+        self.nodes = 0
+        self.stopped = False
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._node_limit = node_limit
+        self._killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self._history = [[value >> 3 for value in side] for side in self._history]
+        self.table.new_search()
+
+        info = None
+
+        for iteration_depth in range(min(start_depth, depth, MAX_PLY), min(depth, MAX_PLY) + 1):
+            self._root_move = 0
+            score = self._search(position, iteration_depth, -INFINITY, INFINITY, 0)
+
+            if self.stopped:
+                break
+
+            elapsed = time.perf_counter() - start
+            info = SearchInfo(iteration_depth, score, self._pv(position, iteration_depth), self.nodes, elapsed)
+
+            if on_iteration is not None:
+                on_iteration(info)
+
+            if abs(score) >= MATE_BOUND and MATE - abs(score) <= iteration_depth:
+                break
+            # the next iteration takes several times longer than this one, do not start what cannot finish
+            if time_limit is not None and elapsed > time_limit / 2:
+                break
+
+        if info is None:
+            # stopped before the first iteration finished
+            info = SearchInfo(0, 0, [self._root_move or moves[0]], self.nodes, time.perf_counter() - start)
+
+        return info
+
+    def _check_limits(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.stopped = True
+        elif self._deadline is not None and time.perf_counter() >= self._deadline:
+            self.stopped = True
+        elif self._node_limit is not None and self.nodes >= self._node_limit:
+            self.stopped = True
+
+    def _pv(self, position: Position, depth: int):
+        """Root move followed by the best moves stored in the table, as long as they stay legal."""
+        pv = [self._root_move]
+        position.make_move(self._root_move)
+        seen = {position.hash}
+
+        while len(pv) < depth:
+            entry = self.table.probe(position.hash)
+            if entry is None or entry[1] not in position.generate_legal_moves():
+                break
+
+            pv.append(entry[1])
+            position.make_move(entry[1])
+
+            if position.hash in seen:
+                break
+            seen.add(position.hash)
+
+        for _ in pv:
+            position.unmake_move()
+
+        return pv
+
+    def _order(self, position: Position, moves: list[int], table_move: int, ply: int):
+        killers = self._killers[ply]
+        history = self._history[position.turn]
+        scores = {}
+
+        for move in moves:
+            if move == table_move:
+                scores[move] = _TT_MOVE_SCORE
+            elif move >> 12 & CAPTURE:
+                victim = PAWN if move >> 12 == EN_PASSANT else position.piece_at((move >> 6) & 0x3F).kind
+                scores[move] = _CAPTURE_SCORE + victim * 8 - position.piece_at(move & 0x3F).kind
+            elif move == killers[0]:
+                scores[move] = _KILLER_SCORE + 1
+            elif move == killers[1]:
+                scores[move] = _KILLER_SCORE
+            else:
+                scores[move] = history[move & 0xFFF]
+
+        moves.sort(key=scores.__getitem__, reverse=True)
+        return moves
+
+    def _record_cutoff(self, position: Position, move: int, depth: int, ply: int):
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        history = self._history[position.turn]
+        history[move & 0xFFF] += depth * depth
+
+        if history[move & 0xFFF] > _HISTORY_LIMIT:
+            for i in range(4096):
+                history[i] >>= 1
+
+    def _search(self, position: Position, depth: int, alpha: int, beta: int, ply: int):
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(position, alpha, beta, ply)
+
+        self.nodes += 1
+        if not self.nodes & _CHECK_MASK:
+            self._check_limits()
+
+        if ply and (position.is_fifty_move_draw() or position.repetition_count() > 1
+                    or position.is_insufficient_material()):
+            return 0
+
+        table_move = 0
+        entry = self.table.probe(position.hash)
+
+        if entry is not None:
+            value, table_move, table_depth, bound = entry
+
+            if ply and table_depth >= depth:
+                value = _from_table(value, ply)
+
+                if bound == EXACT or bound == LOWER and value >= beta or bound == UPPER and value <= alpha:
+                    return value
+
+        in_check = position.in_check()
+        moves = position.generate_legal_moves()
+
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        if in_check:
+            depth += 1
+
+        original_alpha = alpha
+        best_value, best_move = -INFINITY, 0
+
+        for move in self._order(position, moves, table_move, ply):
+            position.make_move(move)
+            value = -self._search(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+
+            if self.stopped:
+                return 0
+
+            if value > best_value:
+                best_value, best_move = value, move
+                if not ply:
+                    self._root_move = move
+
+                if value > alpha:
+                    alpha = value
+
+                    if value >= beta:
+                        if not move >> 12 & CAPTURE:
+                            self._record_cutoff(position, move, depth, ply)
+                        break
+
+        if best_value >= beta:
+            bound = LOWER
+        elif best_value > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+
+        self.table.store(position.hash, depth, _to_table(best_value, ply), best_move, bound)
+        return best_value
+
+    def _quiescence(self, position: Position, alpha: int, beta: int, ply: int):
+        self.nodes += 1
+        if not self.nodes & _CHECK_MASK:
+            self._check_limits()
+
+        stand_pat = evaluate(position)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = [move for move in position.generate_legal_moves() if move >> 12 & CAPTURE]
+
+        for move in self._order(position, captures, 0, ply):
+            position.make_move(move)
+            value = -self._quiescence(position, -beta, -alpha, ply + 1)
+            position.unmake_move()
+
+            if self.stopped:
+                return 0
+
+            if value > alpha:
+                if value >= beta:
+                    return value
+                alpha = value
+
+        return alpha
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search a position and report depth reached and nodes/second.")
+    parser.add_argument("-c", "--config", default="start",
+                        help="'start', 'test', a 64-character board string or a FEN (default: start)")
+    parser.add_argument("-t", "--turn", choices=["white", "black"], default=None,
+                        help="side to move for a board string (default: white)")
+    parser.add_argument("-d", "--depth", type=int, default=MAX_PLY, help="maximum depth in plies")
+    parser.add_argument("--time", type=float, default=5, metavar="SECONDS", help="time limit (default: 5)")
+    parser.add_argument("--nodes", type=int, default=None, help="node limit")
+    parser.add_argument("--hash", type=float, default=16, metavar="MB", help="transposition table size")
+    args = parser.parse_args(argv)
+
+    position = load_position(args.config, args.turn)
+
+    searcher = Searcher(TranspositionTable(args.hash))
+    info = searcher.search(position, args.depth, args.time, args.nodes, on_iteration=print)
+
+    if info is None:
+        raise SearchException("No legal move in the given position")
+
+    print(f"bestmove {move_to_uci(info.best_move)}  depth {info.depth}  nodes {info.nodes}  nps {info.nps}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+_ENTRY_BYTES = 16
+_BUCKET_ENTRIES = 2
+
+
+class TranspositionException(Exception):
+    pass
+
+
+def _pack(value: int, move: int, depth: int, bound: int, age: int):
+    return (value & 0xFFFFFFFF) | (move << 32) | (depth << 48) | (bound << 56) | (age << 58)
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of (key, data) 64-bit word pairs grouped into two-entry buckets. The first entry of
+    a bucket keeps the deepest (or most recent search's) result, the second is always replaced.
+
+    Data packs a signed 32-bit value, a 16-bit move, an 8-bit depth, a 2-bit bound and a 6-bit search age.
+    Keys are stored xor-ed with their data so a torn write from another process reads back as a miss, which
+    lets the table live in shared memory (see ``buffer``).
+    """
+
+    def __init__(self, size_mb: float = 16, buffer=None):
+        if buffer is None:
+            buckets = int(size_mb * 1024 * 1024) // (_ENTRY_BYTES * _BUCKET_ENTRIES)
+
+            if buckets < 1:
+                raise TranspositionException("Transposition table needs room for at least one bucket")
+
+            # round down to a power of two so a key maps to its bucket with a mask
+            buckets = 1 << (buckets.bit_length() - 1)
+            buffer = bytearray(buckets * _ENTRY_BYTES * _BUCKET_ENTRIES)
+
+        self._table = memoryview(buffer).cast('B').cast('Q')
+        self._mask = len(self._table) // (2 * _BUCKET_ENTRIES) - 1
+
+        if self._mask < 0 or (self._mask + 1) & self._mask:
+            raise TranspositionException("Transposition table buffer must hold a power of two number of buckets")
+
+        self.age = 0
+
+    def __len__(self):
+        return len(self._table) // 2
+
+    @staticmethod
+    def buffer_size(size_mb: float):
+        """Bytes a table of ``size_mb`` occupies, for callers that allocate the buffer themselves."""
+        buckets = int(size_mb * 1024 * 1024) // (_ENTRY_BYTES * _BUCKET_ENTRIES)
+        return (1 << (buckets.bit_length() - 1)) * _ENTRY_BYTES * _BUCKET_ENTRIES
+
+    def clear(self):
+        for i in range(len(self._table)):
+            self._table[i] = 0
+
+        self.age = 0
+
+    def new_search(self):
+        self.age = (self.age + 1) & 0x3F
+
+    def probe(self, key: int):
+        """(value, move, depth, bound) stored for ``key``, or None."""
+        table = self._table
+        slot = (key & self._mask) * 2 * _BUCKET_ENTRIES
+
+        for i in range(slot, slot + 2 * _BUCKET_ENTRIES, 2):
+            data = table[i + 1]
+
+            if table[i] ^ data == key:
+                value = data & 0xFFFFFFFF
+                if value & 0x80000000:
+                    value -= 0x100000000
+
+                return value, (data >> 32) & 0xFFFF, (data >> 48) & 0xFF, (data >> 56) & 0x3
+
+        return None
+
+    def store(self, key: int, depth: int, value: int, move=0, bound=EXACT):
+        table = self._table
+        slot = (key & self._mask) * 2 * _BUCKET_ENTRIES
+
+        data = table[slot + 1]
+        stored_depth, stored_age = (data >> 48) & 0xFF, data >> 58
+
+        if table[slot] ^ data != key and stored_age == self.age and depth < stored_depth:
+            # the deep slot holds something more valuable from this search, use the always-replace slot
+            slot += 2
+            if move == 0 and table[slot] ^ table[slot + 1] == key:
+                move = (table[slot + 1] >> 32) & 0xFFFF
+        elif move == 0 and table[slot] ^ data == key:
+            # keep the best move of a previous visit when this one did not produce any
+            move = (data >> 32) & 0xFFFF
+
+        data = _pack(value, move, min(depth, 0xFF), bound, self.age)
+        table[slot] = key ^ data
+        table[slot + 1] = data
+
+    def hashfull(self):
+        """Permille of the first thousand entries written during the current search (UCI ``hashfull``)."""
+        table = self._table
+        sample = min(1000, len(self))
+        used = 0
+
+        for i in range(0, sample * 2, 2):
+            if table[i + 1] and table[i + 1] >> 58 == self.age:
+                used += 1
+
+        return used * 1000 // sample
@@ -0,0 +1,274 @@
+"""
+Universal Chess Interface front-end: ``python -m src.engine.uci`` speaks UCI on stdin/stdout. Commands are read
+on the main thread while searches run on a worker thread, so ``stop`` and ``isready`` are answered mid-search.
+"""
+import os
+import sys
+import threading
+import time
+
+from ..constants import *
+from .position import Position, PositionException
+from .move import move_to_uci
+from .perft import divide
+from .search import Searcher, MAX_PLY
+from .parallel import ParallelSearcher
+from .transposition import TranspositionTable
+
+ENGINE_NAME = "chess_py"
+ENGINE_AUTHOR = "chess_py contributors"
+
+# seconds kept back per move for communication with the GUI
+_MOVE_OVERHEAD = 0.05
+_DEFAULT_MOVES_TO_GO = 30
+
+
+class UCIEngine:
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self._output_lock = threading.Lock()
+
+        self.hash_mb = 16
+        self.threads = 1
+        self._searcher = None
+
+        self.position = Position()
+        self._thread = None
+        # set by ``stop``; an infinite search holds its bestmove back until then
+        self._stop_requested = threading.Event()
+
+    def send(self, line: str):
+        with self._output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self, lines=sys.stdin):
+        for line in lines:
+            if not self.handle(line):
+                break
+
+        self.close()
+
+    def handle(self, line: str):
+        """Process one command line, False once the engine should quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+
+        command, args = tokens[0], tokens[1:]
+
+        match command:
+            case "uci":
+                self.send(f"id name {ENGINE_NAME}")
+                self.send(f"id author {ENGINE_AUTHOR}")
+                self.send("option name Hash type spin default 16 min 1 max 4096")
+                self.send(f"option name Threads type spin default 1 min 1 max {os.cpu_count() or 1}")
+                self.send("uciok")
+            case "isready":
+                self.send("readyok")
+            case "setoption":
+                self._set_option(args)
+            case "ucinewgame":
+                self._stop_search()
+                self._close_searcher()
+            case "position":
+                self._stop_search()
+                self._set_position(args)
+            case "go":
+                self._stop_search()
+                self._go(args)
+            case "stop":
+                self._stop_search()
+            case "quit":
+                return False
+            case _:
+                self.send(f"info string unknown command {command}")
+
+        return True
+
+    def close(self):
+        self._stop_search()
+        self._close_searcher()
+
+    def _set_option(self, args: list[str]):
+        if "name" not in args or "value" not in args:
+            return
+
+        name = " ".join(args[args.index("name") + 1:args.index("value")]).lower()
+        value = " ".join(args[args.index("value") + 1:])
+
+        try:
+            match name:
+                case "hash":
+                    self.hash_mb = max(1, int(value))
+                case "threads":
+                    self.threads = max(1, int(value))
+                case _:
+                    self.send(f"info string unknown option {name}")
+                    return
+        except ValueError:
+            self.send(f"info string invalid value {value} for option {name}")
+            return
+
+        self._stop_search()
+        self._close_searcher()
+
+    def _set_position(self, args: list[str]):
+        if not args:
+            return
+
+        moves = args.index("moves") if "moves" in args else len(args)
+
+        try:
+            if args[0] == "startpos":
+                position = Position(START_CONFIG)
+            elif args[0] == "fen":
+                position = Position(" ".join(args[1:moves]))
+            else:
+                raise PositionException(f"Unknown position type {args[0]}")
+        except PositionException as e:
+            self.send(f"info string {e}")
+            return
+
+        for token in args[moves + 1:]:
+            move = _find_move(position, token)
+
+            if move is None:
+                self.send(f"info string illegal move {token}")
+                return
+
+            position.make_move(move)
+
+        self.position = position
+
+    def _get_searcher(self):
+        if self._searcher is None:
+            if self.threads > 1:
+                self._searcher = ParallelSearcher(self.threads, self.hash_mb)
+            else:
+                self._searcher = Searcher(TranspositionTable(self.hash_mb))
+
+        return self._searcher
+
+    def _close_searcher(self):
+        if isinstance(self._searcher, ParallelSearcher):
+            self._searcher.close()
+
+        self._searcher = None
+
+    def _stop_search(self):
+        self._stop_requested.set()
+
+        # the search may only just be starting and reset its own stop flag, so keep asking until it ends
+        while self._thread is not None and self._thread.is_alive():
+            if self._searcher is not None:
+                self._searcher.stop()
+            self._thread.join(0.05)
+
+        self._thread = None
+
+    def _go(self, args: list[str]):
+        params = _parse_go(args)
+        self._stop_requested.clear()
+
+        if "perft" in params:
+            if params["perft"] < 1:
+                self.send("info string perft depth must be at least 1")
+                return
+
+            target, target_args = self._perft, (params["perft"],)
+        else:
+            # helper processes must be forked here, not from the worker thread while this one blocks on stdin
+            target, target_args = self._search, (self._get_searcher(), params)
+
+        # every command that replaces the position stops the search first, so the worker can use it directly
+        self._thread = threading.Thread(target=target, args=(self.position, *target_args), daemon=True)
+        self._thread.start()
+
+    def _perft(self, position: Position, depth: int):
+        start = time.perf_counter()
+        counts = divide(position, depth, stop_event=self._stop_requested)
+
+        if self._stop_requested.is_set():
+            self.send("info string perft stopped")
+            return
+
+        for move, nodes in counts:
+            self.send(f"{move_to_uci(move)}: {nodes}")
+
+        nodes = sum(count for _, count in counts)
+        elapsed = time.perf_counter() - start
+
+        self.send("")
+        self.send(f"Nodes searched: {nodes}")
+        self.send(f"info string time {int(elapsed * 1000)} nps {int(nodes / elapsed) if elapsed else 0}")
+
+    def _search(self, position: Position, searcher, params: dict):
+        info = searcher.search(position, params.get("depth", MAX_PLY), _time_limit(params, position.turn),
+                               params.get("nodes"), on_iteration=self._send_info)
+
+        if params.get("infinite"):
+            self._stop_requested.wait()
+
+        self.send(f"bestmove {move_to_uci(info.best_move) if info is not None else '0000'}")
+
+    def _send_info(self, info):
+        hashfull = self._searcher.table.hashfull() if self._searcher is not None else 0
+
+        self.send(f"info depth {info.depth} score {info.score_text()} nodes {info.nodes} nps {info.nps} "
+                  f"time {int(info.elapsed * 1000)} hashfull {hashfull} "
+                  f"pv {' '.join(move_to_uci(move) for move in info.pv)}")
+
+
+def _find_move(position: Position, token: str):
+    for move in position.legal_moves():
+        if move_to_uci(move) == token:
+            return move
+
+    return None
+
+
+def _parse_go(args: list[str]):
+    params = {}
+    i = 0
+
+    while i < len(args):
+        name = args[i]
+
+        if name in ("infinite", "ponder"):
+            params[name] = True
+        elif name in ("depth", "nodes", "movetime", "wtime", "btime", "winc", "binc", "movestogo", "perft") \
+                and i + 1 < len(args):
+            if args[i + 1].lstrip("-").isdigit():
+                params[name] = int(args[i + 1])
+            i += 1
+
+        i += 1
+
+    return params
+
+
+def _time_limit(params: dict, turn):
+    """Seconds to spend on this move, None to search until stopped or out of depth/nodes."""
+    if params.get("infinite"):
+        return None
+
+    if "movetime" in params:
+        return max(0.01, params["movetime"] / 1000 - _MOVE_OVERHEAD)
+
+    remaining = params.get("wtime" if turn == USR_WHITE else "btime")
+    if remaining is None:
+        return None
+
+    increment = params.get("winc" if turn == USR_WHITE else "binc", 0)
+    budget = remaining / params.get("movestogo", _DEFAULT_MOVES_TO_GO) + increment * 3 / 4
+
+    return max(0.01, min(budget, remaining / 2) / 1000 - _MOVE_OVERHEAD)
+
+
+def main():
+    UCIEngine().run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+import random
+
+# fixed seed so hashes are stable across processes and runs (stored indexes and shared tables rely on it)
+_rng = random.Random(0x5EED_C0DE)
+
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+SIDE_KEY = _rng.getrandbits(64)
+CASTLING_KEYS = [_rng.getrandbits(64) for _ in range(64)]
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
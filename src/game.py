@@ -1,7 +1,11 @@
 import pygame
-from helper import load_image, grid_board
+from helper import load_image
 
 from src.square import Square
+from src.engine.search import MATE, MATE_BOUND
+from src.engine.analysis import Analyser
+from src.engine.move import move_to_uci
+from src.engine.notation import game_movetext
 from src.ui.board import Board
 from constants import *
 from src.ui.textbox import TextBox
@@ -15,33 +19,72 @@ class GameState(Enum):
     TURN = 0
     CHECKMATED = 1
     STALEMATE = 2
+    FIFTY_MOVE_RULE = 3
+    THREEFOLD_REPETITION = 4
+    INSUFFICIENT_MATERIAL = 5
 
     def is_game_end(self):
-        return self == GameState.CHECKMATED or self == GameState.STALEMATE
+        return self != GameState.TURN
 
 
 class Game:
-    def __init__(self, screen: pygame.Surface | pygame.SurfaceType):
+    def __init__(self, screen: pygame.Surface | pygame.SurfaceType, engine_side=None, engine_time=1.0,
+                 analysis=False):
+        if engine_side not in [None, USR_WHITE, USR_BLACK]:
+            raise GameException("Invalid engine side")
+
         self.screen = screen
         self.is_running = True
 
         self.board = Board((600, 600))
-        self.board.settings.side = USR_WHITE
+        self.board.settings.side = USR_BLACK if engine_side == USR_WHITE else USR_WHITE
+        self.position = self.board.position
+
+        # side played by the built-in engine, None for two human players
+        self.engine_side = engine_side
+        self.engine_time = engine_time
+        # the engine thinks in its own process so the window keeps handling events meanwhile
+        self.engine = Analyser() if engine_side is not None else None
+        self._engine_thinking = False
 
         self.player_names = {USR_WHITE: "Rick1203", USR_BLACK: "3021kicR"}
+        if engine_side is not None:
+            self.player_names[engine_side] = "Engine"
 
         self.state = GameState.TURN
         self.player_txtBox = TextBox(f"{self.player_names[USR_WHITE]}'s turn",
                                      (200, 80), font=pygame.font.Font(None, 25),
                                      color="black", background_color="white")
 
+        # background analysis of the position on screen, restarted whenever it changes
+        self.analyser = Analyser() if analysis else None
+        self.analysis_txtBox = TextBox("", (260, 40), font=pygame.font.Font(None, 22),
+                                       color="white", background_color="black")
+        self.restart_analysis()
+
     @property
     def current_player(self):
-        return USR_WHITE if len(self.board.history) % 2 else USR_BLACK
+        return self.position.turn
 
     def update(self):
         needs_render = False
 
+        if self.is_engine_turn():
+            # the previous update rendered the human move, think now and play once the search reports back
+            if not self._engine_thinking:
+                self.engine.analyse(self.position, self.engine_time)
+                self._engine_thinking = True
+            else:
+                self.engine.poll()
+                if self.engine.finished:
+                    self._engine_thinking = False
+                    self.play_engine_move(self.engine.info)
+                    needs_render = True
+
+        if self.analyser is not None and self.analyser.poll() is not None:
+            self.analysis_txtBox.set(text=self._analysis_text(self.analyser.info))
+            needs_render = True
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.quit()
@@ -75,7 +118,7 @@ class Game:
                 winner = USR_BLACK if self.current_player == USR_WHITE else USR_WHITE
                 msg = self.player_names[winner] + " WINS!!!"
             else:
-                msg = "STALEMATE"
+                msg = self.state.name.replace("_", " ")
 
             end_txt2 = TextBox(msg, (200, 80))
             end_txt2.draw()
@@ -86,6 +129,10 @@ class Game:
         else:
             self.screen.blit(self.player_txtBox.surface, (640, 260))
 
+        if self.analyser is not None:
+            self.analysis_txtBox.draw()
+            self.screen.blit(self.analysis_txtBox.surface, (620, 440))
+
     def _draw_background(self):
         background = load_image("assets/images/background.jpg")
         background = pygame.transform.scale(background, self.screen.get_size())
@@ -103,21 +150,36 @@ class Game:
         if event.mod & pygame.KMOD_CTRL:
             match event.key:
                 case pygame.K_z:
+                    # the engine is searching the current position, wait for its move
+                    if self.is_engine_turn():
+                        return
+
                     print("UNDO")
-                    if self.board.undo():
+                    if self.position.undo():
+                        # take back the engine's reply together with the human move
+                        if self.is_engine_turn():
+                            self.position.undo()
                         self.toggle_current_turn()
                         self.board.selected_square = None
                 case pygame.K_y:
+                    if self.is_engine_turn():
+                        return
+
                     print("REDO")
-                    if self.board.redo():
+                    if self.position.redo():
+                        if self.is_engine_turn():
+                            self.position.redo()
                         self.toggle_current_turn()
                         self.board.selected_square = None
 
                 case pygame.K_s:
                     print(str(self.board))
+                    print(self.position.fen())
+                    print(game_movetext(self.position))
 
     def handle_board_click(self, pos: tuple[int, int]):
-        if self.state != GameState.TURN:
+        # clicks queued behind the human's move must not move the engine's pieces
+        if self.state != GameState.TURN or self.is_engine_turn():
             return
 
         old_square = self.board.selected_square
@@ -127,8 +189,7 @@ class Game:
         old_capture_squares = []
 
         if old_square is not None:
-            old_move_squares = self.get_safe_move_squares(old_square)
-            old_capture_squares = self.get_safe_capture_squares(old_square)
+            old_move_squares, old_capture_squares = self.position.get_safe_squares(old_square)
             self.board.selected_square = None
 
         if new_square in old_move_squares:
@@ -152,7 +213,7 @@ class Game:
         if self.board[from_square].color != self.current_player:
             raise GameException("Wait your turn!")
 
-        self.board.move_piece(from_square, to_square)
+        self.position.move_piece(from_square, to_square)
         self.toggle_current_turn()
         self.set_highlights()
 
@@ -163,7 +224,19 @@ class Game:
         if self.board[from_square].color != self.current_player:
             raise GameException("Wait your turn!")
 
-        self.board.capture_piece(from_square, to_square)
+        self.position.capture_piece(from_square, to_square)
+        self.toggle_current_turn()
+        self.set_highlights()
+
+    def is_engine_turn(self):
+        return self.state == GameState.TURN and self.current_player == self.engine_side
+
+    def play_engine_move(self, info):
+        if info is None:
+            raise GameException("Engine has no move to play")
+
+        print(info)
+        self.position.play(info.best_move)
         self.toggle_current_turn()
         self.set_highlights()
 
@@ -175,73 +248,41 @@ class Game:
                 background_color="white" if self.current_player == USR_WHITE else "black"
             )
 
-            if not self.has_possible_move(self.current_player):
-                self.state = GameState.CHECKMATED if self.on_check(self.current_player) else GameState.STALEMATE
+            if not self.position.has_possible_move(self.current_player):
+                self.state = GameState.CHECKMATED if self.position.on_check(self.current_player) \
+                    else GameState.STALEMATE
+            elif self.position.is_fifty_move_draw():
+                self.state = GameState.FIFTY_MOVE_RULE
+            elif self.position.is_threefold_repetition():
+                self.state = GameState.THREEFOLD_REPETITION
+            elif self.position.is_insufficient_material():
+                self.state = GameState.INSUFFICIENT_MATERIAL
+
+            self.restart_analysis()
         else:
             raise GameException("Invalid turn")
 
-    def get_king_position(self, color):
-        if color not in [USR_WHITE, USR_BLACK]:
-            raise GameException("Invalid color type")
-
-        return Square.from_board_str_index(str(self.board).index('k' if color == USR_WHITE else 'K'))
-
-    def on_check(self, color):
-        if color not in [USR_WHITE, USR_BLACK]:
-            raise GameException("Invalid color type")
-
-        king_square = self.get_king_position(color)
-        return len(self.board.attackers(king_square, USR_BLACK if color == USR_WHITE else USR_WHITE)) > 0
-
-    def get_safe_move_squares(self, square: Square):
-        piece = self.board[square]
-
-        if piece is None:
-            raise GameException(f"Piece must be on square {square} to evaluate its safe moves")
-
-        safe_moves = []
-
-        for move in self.board.get_move_squares(square):
-            self.board.move_piece(square, move, False)
-
-            if not self.on_check(piece.color):
-                safe_moves.append(move)
-                print(grid_board(str(self.board)))
-
-            self.board.undo(False)
-
-        return safe_moves
-
-    def get_safe_capture_squares(self, square: Square):
-        piece = self.board[square]
-
-        if piece is None:
-            raise GameException(f"Piece must be on square {square} to evaluate its safe moves")
-
-        safe_captures = []
-
-        for move in self.board.get_capture_squares(square):
-            self.board.capture_piece(square, move, False)
-
-            if not self.on_check(piece.color):
-                safe_captures.append(move)
-
-            self.board.undo(False)
+    def restart_analysis(self):
+        if self.analyser is None:
+            return
 
-        return safe_captures
+        if self.state.is_game_end():
+            self.analyser.cancel()
+            self.analysis_txtBox.set(text="")
+        else:
+            self.analyser.analyse(self.position)
+            self.analysis_txtBox.set(text="analysing...")
 
-    def has_possible_move(self, color):
-        for y in range(8):
-            for x in range(8):
-                if self.board[x, y] is None or self.board[x, y].color != color:
-                    continue
+    def _analysis_text(self, info):
+        # scores come from the side to move's point of view, show them from white's
+        score = info.score if self.analyser.turn == USR_WHITE else -info.score
 
-                if len(self.get_safe_move_squares(Square(x, y))) > 0 \
-                        or len(self.get_safe_capture_squares(Square(x, y))) > 0:
-                    return Square(x, y), self.get_safe_move_squares(Square(x, y)), self.get_safe_capture_squares(
-                        Square(x, y))
+        if abs(score) >= MATE_BOUND:
+            evaluation = ("M" if score > 0 else "-M") + str((MATE - abs(score) + 1) // 2)
+        else:
+            evaluation = f"{score / 100:+.2f}"
 
-        return False
+        return f"{evaluation}  d{info.depth}  " + " ".join(move_to_uci(move) for move in info.pv[:4])
 
     def set_highlights(self):
         self.board.reset_highlight_color()
@@ -249,29 +290,38 @@ class Game:
         if self.board.selected_square is not None:
             self.board.set_highlight_color(self.board.selected_square, Palette.SELECTED.value)
 
-            for square in self.get_safe_move_squares(self.board.selected_square):
+            move_squares, capture_squares = self.position.get_safe_squares(self.board.selected_square)
+
+            for square in move_squares:
                 self.board.set_highlight_color(square, Palette.MOVABLE.value)
 
-            for square in self.get_safe_capture_squares(self.board.selected_square):
+            for square in capture_squares:
                 self.board.set_highlight_color(square, Palette.CAPTURABLE.value)
 
-        prev_move = self.board.history[-1][1]
+        prev_move = self.position.last_move
         if prev_move[0] is not None:
             self.board.set_highlight_color(prev_move[0], Palette.LAST_MOVE.value)
             self.board.set_highlight_color(prev_move[1], Palette.LAST_MOVE.value)
 
-        if self.on_check(self.current_player):
-            self.board.set_highlight_color(self.get_king_position(self.current_player), Palette.CHECK.value)
+        if self.position.on_check(self.current_player):
+            self.board.set_highlight_color(self.position.get_king_position(self.current_player), Palette.CHECK.value)
 
-        if self.state.is_game_end():
+        if self.state == GameState.CHECKMATED or self.state == GameState.STALEMATE:
             winner = USR_BLACK if self.current_player == USR_WHITE else USR_WHITE
-            king_square = self.get_king_position(self.current_player)
+            king_square = self.position.get_king_position(self.current_player)
 
-            attacked_squares = self.board.get_move_squares(king_square) + self.board.get_capture_squares(king_square)
+            attacked_squares = self.position.get_move_squares(king_square) \
+                + self.position.get_capture_squares(king_square)
 
             for square in [king_square, *attacked_squares]:
-                for attacker in self.board.attackers(square, winner):
+                for attacker in self.position.attackers(square, winner):
                     self.board.set_highlight_color(attacker, Palette.CAPTURABLE.value)
 
     def quit(self):
         self.is_running = False
+
+        if self.analyser is not None:
+            self.analyser.close()
+
+        if self.engine is not None:
+            self.engine.close()
@@ -1,8 +1,6 @@
 import pygame
 import sys
 
-from src.square import Square
-
 _temp = {}
 
 
@@ -39,15 +37,5 @@ def load_pieces(filename):
     return pieces
 
 
-def get_moves_in_direction(square: Square, direction: tuple[int, int]):
-    x, y = square.x, square.y
-
-    while Square.is_valid(x + direction[0], y + direction[1]):
-        x += direction[0]
-        y += direction[1]
-
-        yield Square(x, y)
-
-
 def grid_board(board_str):
     return "--------\n" + "\n".join([board_str[i * 8:(i + 1) * 8] for i in range(8)]) + "\n--------"
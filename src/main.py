@@ -1,3 +1,4 @@
+import argparse
 import pygame
 import sys
 
@@ -8,8 +9,16 @@ pygame.init()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Play chess against a friend or the built-in engine.")
+    parser.add_argument("--engine", choices=["white", "black"], default=None, help="side the engine plays")
+    parser.add_argument("--engine-time", type=float, default=1.0, metavar="SECONDS", help="engine time per move")
+    parser.add_argument("--analysis", action="store_true", help="analyse the position on screen in the background")
+    args = parser.parse_args(sys.argv[1:])
+
+    engine_side = None if args.engine is None else USR_WHITE if args.engine == "white" else USR_BLACK
+
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    game = Game(screen)
+    game = Game(screen, engine_side, args.engine_time, args.analysis)
     game.render()
 
     while game.is_running:
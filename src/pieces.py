@@ -1,56 +1,104 @@
-from constants import *
+from .constants import *
+
 
 class PieceException(Exception):
     pass
 
 
 class Piece:
-    def __init__(self, color=USR_WHITE):
-        self.name = None
-        self.short = None
-        self.color = color
-
+    """
+    Pieces are immutable and shared: there is exactly one instance per (color, kind), so ``Pawn(USR_WHITE)``
+    returns the same object every time. ``code`` (``color * 6 + kind``) indexes ``PIECES`` and the board's
+    bitboards.
+    """
+    __slots__ = ("name", "short", "kind", "color", "code")
+
+    NAME = None
+    KIND = None
+    SHORTS = (None, None)
+
+    def __new__(cls, color=USR_WHITE):
         if color not in [USR_WHITE, USR_BLACK]:
             raise PieceException("Invalid piece color, got " + str(color))
 
+        if cls.KIND is None:
+            raise PieceException("Cannot create a piece without a kind")
+
+        return PIECES[color * 6 + cls.KIND]
+
+    def __setattr__(self, key, value):
+        raise PieceException("Pieces are shared and cannot be modified")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({'USR_WHITE' if self.color == USR_WHITE else 'USR_BLACK'})"
+
+    def __reduce__(self):
+        return piece_from_code, (self.code,)
+
 
 class Pawn(Piece):
-    def __init__(self, color=USR_WHITE):
-        super().__init__(color)
-        self.name = "pawn"
-        self.short = "p" if color == USR_WHITE else "P"
+    __slots__ = ()
+
+    NAME = "pawn"
+    KIND = PAWN
+    SHORTS = ("p", "P")
 
 
 class Knight(Piece):
-    def __init__(self, color=USR_WHITE):
-        super().__init__(color)
-        self.name = "knight"
-        self.short = "n" if color == USR_WHITE else "N"
+    __slots__ = ()
+
+    NAME = "knight"
+    KIND = KNIGHT
+    SHORTS = ("n", "N")
 
 
 class Bishop(Piece):
-    def __init__(self, color=USR_WHITE):
-        super().__init__(color)
-        self.name = "bishop"
-        self.short = "b" if color == USR_WHITE else "B"
+    __slots__ = ()
+
+    NAME = "bishop"
+    KIND = BISHOP
+    SHORTS = ("b", "B")
 
 
 class Rook(Piece):
-    def __init__(self, color=USR_WHITE):
-        super().__init__(color)
-        self.name = "rook"
-        self.short = "r" if color == USR_WHITE else "R"
+    __slots__ = ()
+
+    NAME = "rook"
+    KIND = ROOK
+    SHORTS = ("r", "R")
 
 
 class Queen(Piece):
-    def __init__(self, color=USR_WHITE):
-        super().__init__(color)
-        self.name = "queen"
-        self.short = "q" if color == USR_WHITE else "Q"
+    __slots__ = ()
+
+    NAME = "queen"
+    KIND = QUEEN
+    SHORTS = ("q", "Q")
 
 
 class King(Piece):
-    def __init__(self, color=USR_WHITE):
-        super().__init__(color)
-        self.name = "king"
-        self.short = "k" if color == USR_WHITE else "K"
+    __slots__ = ()
+
+    NAME = "king"
+    KIND = KING
+    SHORTS = ("k", "K")
+
+
+def _create(cls, color):
+    piece = object.__new__(cls)
+
+    for attr, value in (("name", cls.NAME), ("short", cls.SHORTS[color]), ("kind", cls.KIND), ("color", color),
+                        ("code", color * 6 + cls.KIND)):
+        object.__setattr__(piece, attr, value)
+
+    return piece
+
+
+# indexed by code, i.e. color * 6 + kind
+PIECES: list[Piece] = [_create(cls, color) for color in (USR_WHITE, USR_BLACK)
+                       for cls in (Pawn, Knight, Bishop, Rook, Queen, King)]
+PIECES_BY_SHORT = {piece.short: piece for piece in PIECES}
+
+
+def piece_from_code(code: int):
+    return PIECES[code]
@@ -3,12 +3,19 @@ class SquareException(Exception):
 
 
 class Square:
-    def __init__(self, x: int, y: int):
-        if not Square.is_valid(x, y):
+    """
+    One shared, immutable object per board square: ``Square(x, y)`` and ``Square.from_board_str_index(i)`` look
+    the square up in a 64-entry table instead of allocating.
+    """
+    __slots__ = ("_x", "_y", "_index")
+
+    _table: list["Square"] = []
+
+    def __new__(cls, x: int, y: int):
+        if type(x) is not int or type(y) is not int or not (0 <= x < 8 and 0 <= y < 8):
             raise SquareException(f"Invalid Square ({x}, {y})")
 
-        self._x = x
-        self._y = y
+        return Square._table[y * 8 + x]
 
     def __repr__(self):
         return f"Square('{str(self)}')"
@@ -17,26 +24,32 @@ class Square:
         return "abcdefgh"[self._x] + str(self._y + 1)
 
     def __eq__(self, other):
-        if not isinstance(other, self.__class__):
-            raise SquareException("Cannot equate type of " + str(self.__class__) + " with " + str(other.__class__))
+        if isinstance(other, Square):
+            return self._index == other._index
+
+        return NotImplemented
 
-        return self.x == other.x and self.y == other.y
+    def __hash__(self):
+        return self._index
+
+    def __reduce__(self):
+        return Square.from_board_str_index, (self._index,)
 
     def __add__(self, other):
         if not isinstance(other, tuple):
             raise SquareException("Cannot add type of " + str(other.__class__) + " to " + str(self.__class__))
 
-        if len(other) != 2 or not isinstance(other[0], int) or not isinstance(other[1], int):
+        if len(other) != 2:
             raise SquareException("Tuple must have 2 integers only")
 
-        return Square(self.x + other[0], self.y + other[1])
+        return Square(self._x + other[0], self._y + other[1])
 
     def __sub__(self, other):
         if isinstance(other, tuple):
             other = Square(*other)
 
-        if isinstance(other, self.__class__):
-            return self.x - other.x, self.y - other.y
+        if isinstance(other, Square):
+            return self._x - other._x, self._y - other._y
 
         raise SquareException("Cannot subtract type " + str(other.__class__) + " from " + str(self.__class__))
 
@@ -48,8 +61,13 @@ class Square:
     def y(self):
         return self._y
 
+    @property
+    def index(self):
+        return self._index
+
     def copy(self):
-        return Square(self._x, self._y)
+        # squares are shared and immutable
+        return self
 
     @staticmethod
     def is_valid(x: int, y: int):
@@ -62,8 +80,21 @@ class Square:
         return False
 
     def to_board_str_index(self):
-        return self.y * 8 + self.x
+        return self._index
 
     @staticmethod
     def from_board_str_index(b_index):
-        return Square(b_index % 8, b_index // 8)
+        if not 0 <= b_index < 64:
+            raise SquareException(f"Invalid Square index {b_index}")
+
+        return Square._table[b_index]
+
+
+def _build_table():
+    for index in range(64):
+        square = object.__new__(Square)
+        square._x, square._y, square._index = index % 8, index // 8, index
+        Square._table.append(square)
+
+
+_build_table()